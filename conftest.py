@@ -0,0 +1 @@
+# Lets the tests in tests/ import main_project and fixture_server from here
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+@title: Grey Literature Search Tool - Search API fixture server
+@desc: Serves the documents in 'fixtures/search_api.json' through a local copy
+        of the gov.uk Search API (search.json) so that the API search backend
+        of main_project.py can be used and tested without a connection.
+
+        Usage:
+            python fixture_server.py [port]
+            GREY_REVIEW_SEARCH_API=http://127.0.0.1:8765/api/search.json python main_project.py
+"""
+import json
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'search_api.json')
+
+# =============================================================================
+# Returns the documents matching the Search API query parameters given, in the
+# same shape as the real search.json response
+# =============================================================================
+def search(documents, query):
+    results = documents
+    words = query.get('q', [''])[0].lower().split()
+    if words:
+        results = [doc for doc in results
+                   if all(w in (doc['title']+" "+doc['description']).lower() for w in words)]
+    orgs = query.get('filter_organisations[]', []) + query.get('filter_organisations', [])
+    if orgs:
+        results = [doc for doc in results
+                   if any(org['slug'] in orgs for org in doc['organisations'])]
+    for cond in query.get('filter_public_timestamp', [''])[0].split(","):
+        if cond.startswith('from:'):
+            results = [doc for doc in results if doc['public_timestamp'][:10]>=cond[5:]]
+        elif cond.startswith('to:'):
+            results = [doc for doc in results if doc['public_timestamp'][:10]<=cond[3:]]
+    order = query.get('order', [''])[0]
+    if order:
+        results = sorted(results, key=lambda doc: doc['public_timestamp'], reverse=order.startswith('-'))
+    start = int(query.get('start', ['0'])[0])
+    count = int(query.get('count', ['10'])[0])
+    fields = query.get('fields[]', []) + query.get('fields', [])
+    page = results[start:start+count]
+    if fields:
+        page = [{k: v for k, v in doc.items() if k in fields} for doc in page]
+    return {'results': page, 'total': len(results), 'start': start, 'suggested_queries': []}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    documents = []
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path!='/api/search.json':
+            self.send_error(404)
+            return
+        body = json.dumps(search(self.documents, parse_qs(parts.query))).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+# =============================================================================
+# Starts the fixture server and returns it (serve_forever is left to the caller)
+# =============================================================================
+def make_server(port=8765, fixture_path=FIXTURE_PATH):
+    with open(fixture_path) as f:
+        FixtureHandler.documents = json.load(f)['results']
+    return ThreadingHTTPServer(('127.0.0.1', port), FixtureHandler)
+
+
+if __name__=='__main__':
+    port = int(sys.argv[1]) if len(sys.argv)>1 else 8765
+    server = make_server(port)
+    print(f"Serving {FIXTURE_PATH} at http://127.0.0.1:{server.server_port}/api/search.json")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -9,9 +9,27 @@ Created on Wed Jul 31 14:42:16 2024
         either the user or a generative AI model
 """
 # Used for searching through web URLs and retrieving information
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+import soupsieve
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from collections import deque
+import threading
+import queue
+import time
+import random
+from contextlib import contextmanager
+import tracemalloc
+import importlib.util
+
+# Used to keep a local cache of the pages that were retrieved
+import sqlite3
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
 # Used to read in dataset containing all departments, public bodies, etc. (pandas is also used)
 import csv
@@ -31,37 +49,754 @@ from datetime import datetime
 # Used to export results to Excel or Word
 import pandas as pd
 import os
+import sys
 import docx
 
+# Used to store the compiled catalogue of departments and blogs
+import pickle
+import bisect
 
-# Class HyperLinkManager taken from https://stackoverflow.com/questions/76326100/how-to-add-hyperlink-to-a-tkinter-output-text
-class HyperlinkManager:
-    def __init__(self, text):
-        self.text = text
-        self.text.tag_config("hyper", foreground="blue", underline=1)
-        self.text.tag_bind("hyper", "<Button-1>", self._click)
-        self.reset()
 
-    def reset(self):
-        self.links = {}
+# =============================================================================
+# Returns a date shown in the results (DD/MM/YYYY or "1 January 2024") as
+# (year, month, day) so that results can be sorted by it. Dates that cannot
+# be read come out as (0, 0, 0)
+# =============================================================================
+def sortable_date(date):
+    for fmt in ('%d/%m/%Y', '%d %B %Y'):
+        try:
+            p = datetime.strptime(date.strip(), fmt)
+            return (p.year, p.month, p.day)
+        except (AttributeError, ValueError):
+            pass
+    return (0, 0, 0)
 
-    def add(self, action):
-        # add an action to the manager.  returns tags to use in
-        # associated text widget
-        tag = "hyper-%d" % len(self.links)
-        self.links[tag] = action
-        return "hyper", tag
-
-    def _click(self, event):
-        for tag in self.text.tag_names(tk.CURRENT):
-            if tag[:6] == "hyper-":
-                self.links[tag]()
-                return
+# =============================================================================
+# A scrollable list where only the rows that fit in the view are made into
+# widgets. Scrolling fills those rows with other items from 'order', so the
+# list can hold any number of items. Subclasses make the widgets of a row in
+# _make_slot and fill them with an item in _fill_slot. Controls above the
+# list go in 'toolbar'
+# =============================================================================
+class VirtualList:
+    ROW_FONT = ("Arial", 13)
+
+    def __init__(self, parent, rows=20, bg="white"):
+        self.order = []
+        self.top = 0
+        self.rows = rows
+        self.frame = tk.Frame(parent, bg=parent['bg'])
+        self.toolbar = tk.Frame(self.frame, bg=parent['bg'])
+        self.toolbar.pack(fill=tk.X, pady=5)
+        body = tk.Frame(self.frame, bg=bg)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.scrollbar = tk.Scrollbar(body, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        rows_frame = tk.Frame(body, bg=bg)
+        rows_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.slots = []
+        for k in range(rows):
+            row = tk.Frame(rows_frame, bg=bg)
+            row.grid(row=k, column=0, sticky='w')
+            slot = self._make_slot(row, k, bg)
+            slot['Row'] = row
+            self.slots.append(slot)
+            for widget in [row] + row.winfo_children():
+                self._bind_wheel(widget)
+        self._bind_wheel(rows_frame)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    # Scrollbar command, moves to a fraction of the list or by units/pages
+    def yview(self, *args):
+        if args[0]=='moveto':
+            self.top = int(float(args[1]) * len(self.order))
+        elif args[0]=='scroll':
+            step = self.rows if args[2]=='pages' else 1
+            self.top += int(args[1]) * step
+        self._refresh()
+
+    # Returns the item shown in row k, or None if the row is empty
+    def item_at(self, k):
+        if self.top+k<len(self.order):
+            return self.order[self.top+k]
+        return None
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._wheel)
+        widget.bind("<Button-4>", self._wheel)
+        widget.bind("<Button-5>", self._wheel)
+
+    def _wheel(self, event):
+        if event.num==4 or event.delta>0:
+            self.yview('scroll', -3, 'units')
+        else:
+            self.yview('scroll', 3, 'units')
+
+    def _make_slot(self, row, k, bg):
+        return {}
+
+    def _fill_slot(self, slot, item):
+        pass
+
+    # Called after every refresh, to update any counts shown in the toolbar
+    def _show_status(self):
+        pass
+
+    # Fills the row widgets with the items that are scrolled into view
+    def _refresh(self):
+        self.top = max(0, min(self.top, len(self.order)-self.rows))
+        for k, slot in enumerate(self.slots):
+            item = self.item_at(k)
+            if item!=None:
+                self._fill_slot(slot, item)
+                slot['Row'].grid()
+            else:
+                slot['Row'].grid_remove()
+        if len(self.order)>0:
+            self.scrollbar.set(self.top/len(self.order), min(1, (self.top+self.rows)/len(self.order)))
+        else:
+            self.scrollbar.set(0, 1)
+        self._show_status()
+
+# =============================================================================
+# A scrollable list of results with a checkbox for each one. Which results
+# are ticked is kept in a bitset, so selecting all, filtering and sorting
+# work over every result without making widgets
+# =============================================================================
+class ResultsView(VirtualList):
+    SORT_OPTIONS = ["Original order", "Title", "Department", "Newest First", "Oldest First"]
+
+    # 'more' (if given) returns the next page of results, or an empty list
+    # once there are none left. It is called whenever the list is scrolled
+    # near the end of the results it has, and for every page left before the
+    # results are all selected, filtered or sorted. 'total' is how many there are
+    def __init__(self, parent, rows=20, bg="white", more=None, total=None):
+        self.results = []
+        self.bits = bytearray()
+        self.selected_count = 0
+        self.filter_text = ""
+        self.sort_by = self.SORT_OPTIONS[0]
+        self.more = more
+        self.total = total
+        self.loading = False
+        super().__init__(parent, rows, bg)
+
+        self.all_var = tk.IntVar()
+        tk.Checkbutton(self.toolbar, text="Select all", variable=self.all_var, command=self._select_all,
+                       bg=parent['bg']).pack(side=tk.LEFT)
+        tk.Label(self.toolbar, text="Filter", bg=parent['bg']).pack(side=tk.LEFT, padx=(20, 5))
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add('write', lambda *args: self.set_filter(self.filter_var.get()))
+        tk.Entry(self.toolbar, textvariable=self.filter_var, highlightbackground=parent['bg']).pack(side=tk.LEFT)
+        tk.Label(self.toolbar, text="Sort by", bg=parent['bg']).pack(side=tk.LEFT, padx=(20, 5))
+        self.sort_var = tk.StringVar(value=self.sort_by)
+        tk.OptionMenu(self.toolbar, self.sort_var, *self.SORT_OPTIONS, command=self.set_sort).pack(side=tk.LEFT)
+        self.count_label = tk.Label(self.toolbar, bg=parent['bg'])
+        self.count_label.pack(side=tk.RIGHT)
+        self._refresh()
+
+    def is_selected(self, i):
+        return (self.bits[i >> 3] >> (i & 7)) & 1
+
+    def set_selected(self, i, value):
+        if self.is_selected(i)==bool(value):
+            return
+        self.bits[i >> 3] ^= 1 << (i & 7)
+        self.selected_count += 1 if value else -1
+
+    # Returns the ticked results in the order they were added
+    def selected(self):
+        return [self.results[i] for i in range(len(self.results)) if self.is_selected(i)]
+
+    # Adds results to the end of the list
+    def add(self, results):
+        start = len(self.results)
+        for elem in results:
+            if type(elem['Departments, Agencies, and Public bodies'])==list:
+                elem['Departments, Agencies, and Public bodies'] = ", ".join(elem['Departments, Agencies, and Public bodies'])
+            self.results.append(elem)
+        self.bits.extend(bytes((len(self.results)+7)//8 - len(self.bits)))
+        new = [i for i in range(start, len(self.results)) if self._matches(i)]
+        if self.sort_by==self.SORT_OPTIONS[0]:
+            self.order.extend(new)
+        else:
+            self.order = self._sorted(self.order + new)
+        self._refresh()
+
+    # Adds every page of results that has not been loaded yet. Each page is
+    # added before the next is asked for, as 'more' may count the results
+    # the list already has to know where the next page starts
+    def load_all(self):
+        while self.more!=None:
+            page = self.more()
+            if len(page)==0:
+                self.more = None
+                self._show_status()
+            else:
+                self.add(page)
+
+    def set_filter(self, text):
+        self.filter_text = text.strip().lower()
+        if self.filter_text!="":
+            self.load_all()
+        self.order = self._sorted([i for i in range(len(self.results)) if self._matches(i)])
+        self.top = 0
+        self._refresh()
+
+    def set_sort(self, sort_by):
+        self.sort_by = sort_by
+        if sort_by!=self.SORT_OPTIONS[0]:
+            self.load_all()
+        self.order = self._sorted(self.order)
+        self.top = 0
+        self._refresh()
+
+    def _matches(self, i):
+        if self.filter_text=="":
+            return True
+        elem = self.results[i]
+        return self.filter_text in elem['Title'].lower() or self.filter_text in elem['Departments, Agencies, and Public bodies'].lower()
+
+    def _sorted(self, order):
+        if self.sort_by=="Title":
+            return sorted(order, key=lambda i: self.results[i]['Title'].lower())
+        if self.sort_by=="Department":
+            return sorted(order, key=lambda i: self.results[i]['Departments, Agencies, and Public bodies'].lower())
+        if self.sort_by in ("Newest First", "Oldest First"):
+            return sorted(order, key=lambda i: sortable_date(self.results[i]['Date Published']),
+                          reverse=self.sort_by=="Newest First")
+        return sorted(order)
+
+    # Ticks or unticks every result that matches the filter
+    def _select_all(self):
+        value = self.all_var.get()
+        if value:
+            self.load_all()
+        for i in self.order:
+            self.set_selected(i, value)
+        self._refresh()
+
+    def _toggle(self, k):
+        i = self.item_at(k)
+        if i!=None:
+            self.set_selected(i, self.slots[k]['Var'].get())
+        self._refresh()
+
+    def _open(self, k, event=None):
+        i = self.item_at(k)
+        if i!=None:
+            webbrowser.open(self.results[i]['URL'])
+
+    def _make_slot(self, row, k, bg):
+        var = tk.IntVar()
+        cb = tk.Checkbutton(row, variable=var, anchor='w', bg=bg, width=35, font=self.ROW_FONT,
+                            command=partial(self._toggle, k))
+        cb.pack(side=tk.LEFT)
+        title = tk.Label(row, anchor='w', bg=bg, fg="blue", cursor="hand2", width=60, font=self.ROW_FONT+("underline",))
+        title.pack(side=tk.LEFT)
+        title.bind("<Button-1>", partial(self._open, k))
+        dates = tk.Label(row, anchor='w', bg=bg, font=self.ROW_FONT)
+        dates.pack(side=tk.LEFT)
+        return {'Var': var, 'Check': cb, 'Title': title, 'Dates': dates}
+
+    def _fill_slot(self, slot, i):
+        elem = self.results[i]
+        slot['Var'].set(self.is_selected(i))
+        slot['Check'].configure(text=f"{elem['Departments, Agencies, and Public bodies']}.")
+        slot['Title'].configure(text=elem['Title'])
+        slot['Dates'].configure(text=f"({elem['Date Published'][-4:]}) (Last Updated {elem['Last Updated'][-4:]})")
+
+    def _show_status(self):
+        text = f"{self.selected_count} of {len(self.results)} selected"
+        if self.more!=None and self.total!=None:
+            text += f" ({len(self.results)} of {self.total} loaded)"
+        self.count_label.configure(text=text)
+
+    def _refresh(self):
+        super()._refresh()
+        if self.more!=None and not self.loading and self.top+2*self.rows>=len(self.order):
+            self.loading = True
+            self.frame.after_idle(self._load_more)
+
+    # Adds the next page of results. Called when idle rather than from
+    # _refresh so that loading several pages in a row does not recurse
+    def _load_more(self):
+        self.loading = False
+        if self.more==None or not self.frame.winfo_exists():
+            return
+        page = self.more()
+        if len(page)==0:
+            self.more = None
+            self._show_status()
+        else:
+            self.add(page)
+
+# =============================================================================
+# The list of departments, agencies and public bodies on the front page. Each
+# department can be expanded to show the agencies and public bodies it works
+# with, found through the 'groups' and 'children' indexes of the catalogue.
+# Typing in the search box shows only the titles that match it. Items are
+# rows of the catalogue's titles
+# =============================================================================
+class OrganisationPicker(VirtualList):
+    def __init__(self, parent, catalogue, rows=24, bg="white"):
+        self.catalogue = catalogue
+        self.ticked = bytearray(len(catalogue['titles']))
+        self.selected_count = 0
+        self.expanded = set()
+        self.searching = False
+        super().__init__(parent, rows, bg)
+
+        tk.Label(self.toolbar, text="Search", bg=parent['bg']).pack(side=tk.LEFT, padx=(0, 5))
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add('write', lambda *args: self.set_search(self.search_var.get()))
+        tk.Entry(self.toolbar, textvariable=self.search_var, width=40, highlightbackground=parent['bg']).pack(side=tk.LEFT)
+        self.count_label = tk.Label(self.toolbar, bg=parent['bg'])
+        self.count_label.pack(side=tk.RIGHT)
+        self.order = list(catalogue['departments'])
+        self._refresh()
+
+    # Returns the ticked rows in the order they are listed
+    def selected_rows(self):
+        return [row for row, ticked in enumerate(self.ticked) if ticked]
+
+    def set_search(self, text):
+        rows = match_titles(self.catalogue, text)
+        self.searching = rows!=None
+        if rows==None:
+            rows = []
+            for row in self.catalogue['departments']:
+                rows.append(row)
+                if row in self.expanded:
+                    rows.extend(self._group_rows(row))
+        self.order = rows
+        self.top = 0
+        self._refresh()
+
+    # Shows or hides the agencies and public bodies a department works with
+    def toggle_group(self, k, event=None):
+        row = self.item_at(k)
+        if row==None or self.searching or row not in self.catalogue['groups']:
+            return
+        position = self.top+k+1
+        if row in self.expanded:
+            self.expanded.discard(row)
+            del self.order[position:position+len(self._group_rows(row))]
+        else:
+            self.expanded.add(row)
+            self.order[position:position] = self._group_rows(row)
+        self._refresh()
+
+    # Returns the marker row and the rows below it for a department
+    def _group_rows(self, row):
+        marker = self.catalogue['groups'][row]
+        return [marker] + self.catalogue['children'][marker]
+
+    def _toggle(self, k):
+        row = self.item_at(k)
+        if row!=None:
+            value = self.slots[k]['Var'].get()
+            self.selected_count += value - self.ticked[row]
+            self.ticked[row] = value
+        self._refresh()
+
+    def _make_slot(self, row, k, bg):
+        arrow = tk.Label(row, width=2, bg=bg, cursor="hand2", font=self.ROW_FONT)
+        arrow.pack(side=tk.LEFT)
+        arrow.bind("<Button-1>", partial(self.toggle_group, k))
+        var = tk.IntVar()
+        cb = tk.Checkbutton(row, variable=var, anchor='w', bg=bg, width=80, font=self.ROW_FONT,
+                            command=partial(self._toggle, k))
+        cb.pack(side=tk.LEFT)
+        return {'Arrow': arrow, 'Var': var, 'Check': cb, 'Background': bg}
+
+    def _fill_slot(self, slot, row):
+        title = self.catalogue['titles'][row]
+        slot['Var'].set(self.ticked[row])
+        if row in self.catalogue['groups'] and not self.searching:
+            slot['Arrow'].configure(text="▾" if row in self.expanded else "▸")
+        else:
+            slot['Arrow'].configure(text="")
+        if title==ASSOCIATED_MARKER:
+            slot['Check'].configure(text=f"    {title}", bg="light grey", font=self.ROW_FONT)
+        elif "\t" in title:
+            slot['Check'].configure(text=f"        {title.strip()}", bg=slot['Background'], font=self.ROW_FONT)
+        else:
+            slot['Check'].configure(text=title, bg=slot['Background'], font=self.ROW_FONT+("bold",))
+
+    def _show_status(self):
+        self.count_label.configure(text=f"{self.selected_count} selected")
 
 headers = {
     'User-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/105.0.0.0 Safari/537.36'
 }
 
+# =============================================================================
+# Settings for the shared HTTP layer. Timeouts are (connect, read) in seconds
+# and failed GETs are retried with an exponential backoff of
+# REQUEST_BACKOFF * 2^(attempt - 1) seconds
+# =============================================================================
+REQUEST_TIMEOUT = (5, 20)
+REQUEST_RETRIES = 3
+REQUEST_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+POOL_SIZE = 16
+
+# =============================================================================
+# Raised by fetch when a page could not be retrieved. 'status' is the HTTP
+# status code if the server answered, otherwise None
+# =============================================================================
+class FetchError(Exception):
+    def __init__(self, url, reason, status=None):
+        super().__init__(f"{reason} ({url})")
+        self.url = url
+        self.reason = reason
+        self.status = status
+
+# =============================================================================
+# Returns a requests Session that keeps connections alive, pools them per host
+# and retries idempotent requests
+# =============================================================================
+def make_session():
+    session = requests.Session()
+    session.headers.update(headers)
+    retry = Retry(total=REQUEST_RETRIES, backoff_factor=REQUEST_BACKOFF,
+                  status_forcelist=RETRY_STATUSES, allowed_methods=frozenset(['GET', 'HEAD']),
+                  raise_on_status=False, respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+http_session = make_session()
+
+# The most recent fetch failures, kept so they can be inspected after a search
+fetch_errors = deque(maxlen=200)
+
+# =============================================================================
+# Records a failed fetch
+# =============================================================================
+def log_fetch_error(err):
+    fetch_errors.append({'URL': err.url, 'Reason': err.reason, 'Status': err.status,
+                         'Time': datetime.now().isoformat(timespec='seconds')})
+    print(f"FETCH ERROR: {err}")
+
+# =============================================================================
+# Settings for the on-disk response cache. How long a page is used without
+# asking the server again depends on what kind of page it is (in seconds);
+# once that time has passed the page is revalidated with ETag/Last-Modified.
+# The least recently used pages are removed once CACHE_MAX_BYTES is reached
+# =============================================================================
+CACHE_PATH = 'http_cache.sqlite'
+CACHE_ENABLED = os.environ.get('GREY_REVIEW_NO_CACHE') is None
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+CACHE_TTLS = {
+    'search': 60 * 60,
+    'blog': 60 * 60,
+    'organisation': 24 * 60 * 60,
+    'document': 7 * 24 * 60 * 60,
+}
+TRACKING_PARAMS = ('gclid', 'fbclid', 'mc_cid', 'mc_eid', '_ga', '_gl')
+
+# =============================================================================
+# Returns True if a query parameter is only used for tracking visitors
+# =============================================================================
+def is_tracking_param(name):
+    return name.startswith('utm_') or name in TRACKING_PARAMS
+
+# =============================================================================
+# Returns the URL (with any extra query parameters) in a single normalised
+# form so that the same page is always stored under the same key
+# =============================================================================
+def normalise_url(url, params=None):
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme=='http' and netloc.endswith(':80')) or (scheme=='https' and netloc.endswith(':443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        for k, v in params.items():
+            if isinstance(v, (list, tuple)):
+                query += [(k, str(x)) for x in v]
+            else:
+                query.append((k, str(v)))
+    query = sorted((k, v) for k, v in query if not is_tracking_param(k))
+    return urlunsplit((scheme, netloc, parts.path or '/', urlencode(query), ''))
+
+# =============================================================================
+# Returns the URL of a result in the form used to recognise the same document
+# found through different sources: without the scheme, "www.", a trailing
+# slash, the fragment or any tracking parameters
+# =============================================================================
+def canonical_url(url):
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.endswith(':80') or host.endswith(':443'):
+        host = host.rsplit(':', 1)[0]
+    if host.startswith('www.'):
+        host = host[4:]
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not is_tracking_param(k))
+    key = host + parts.path.rstrip('/')
+    if len(query)>0:
+        key += "?" + urlencode(query)
+    return key
+
+# =============================================================================
+# Returns which kind of page a URL points to, used to pick its cache lifetime
+# =============================================================================
+def url_class(url):
+    parts = urlsplit(url)
+    if not parts.netloc.endswith('gov.uk') or '.blog.gov.uk' in parts.netloc:
+        return 'blog'
+    if parts.path.startswith('/search') or parts.path.startswith('/api/search'):
+        return 'search'
+    if parts.path.startswith('/government/organisations'):
+        return 'organisation'
+    return 'document'
+
+# =============================================================================
+# A response that was served from the cache. It has the same attributes that
+# the scraping functions use from a requests Response
+# =============================================================================
+class CachedResponse:
+    def __init__(self, url, text, headers, revalidated=False):
+        self.url = url
+        self.text = text
+        self.headers = headers
+        self.status_code = 200
+        self.from_cache = True
+        self.revalidated = revalidated
+
+# =============================================================================
+# Stores retrieved pages in a SQLite database so that repeated searches can be
+# answered from disk. Safe to use from several threads at once
+# =============================================================================
+class ResponseCache:
+    def __init__(self, path, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                                 key TEXT PRIMARY KEY, url TEXT, body TEXT,
+                                 etag TEXT, last_modified TEXT,
+                                 stored REAL, accessed REAL, size INTEGER)""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    # Returns the stored entry for a key as a dictionary, or None
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT url, body, etag, last_modified, stored FROM responses WHERE key=?", (key,)).fetchone()
+            if row==None:
+                return None
+            self.conn.execute("UPDATE responses SET accessed=? WHERE key=?", (time.time(), key))
+            self.conn.commit()
+        return {'URL': row[0], 'Body': row[1], 'ETag': row[2], 'Last-Modified': row[3], 'Stored': row[4]}
+
+    def put(self, key, url, body, etag=None, last_modified=None):
+        now = time.time()
+        size = len(body.encode('utf-8', 'replace'))
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE key=?", (key,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                              (key, url, body, etag, last_modified, now, now, size))
+            self.size += size - (old[0] if old else 0)
+            if self.size>self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    # Marks an entry as fresh again after the server answered 304 Not Modified
+    def touch(self, key):
+        with self.lock:
+            now = time.time()
+            self.conn.execute("UPDATE responses SET stored=?, accessed=? WHERE key=?", (now, now, key))
+            self.conn.commit()
+
+    # Removes the least recently used entries until the cache is below 90% of its size cap
+    def _evict(self):
+        target = self.size - int(self.max_bytes * 0.9)
+        freed = 0
+        keys = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if freed>=target:
+                break
+            keys.append((key,))
+            freed += size
+        self.conn.executemany("DELETE FROM responses WHERE key=?", keys)
+        self.size -= freed
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+            self.size = 0
+
+response_cache = None
+cache_lock = threading.Lock()
+
+# =============================================================================
+# Returns the shared response cache, opening it the first time it is needed.
+# Returns None if caching is turned off or the cache file cannot be opened
+# =============================================================================
+def get_response_cache():
+    global response_cache, CACHE_ENABLED
+    if not CACHE_ENABLED:
+        return None
+    with cache_lock:
+        if response_cache==None:
+            try:
+                response_cache = ResponseCache(CACHE_PATH)
+            except sqlite3.Error as e:
+                print(f"Response cache disabled: {e}")
+                CACHE_ENABLED = False
+        return response_cache
+
+# =============================================================================
+# Retrieves a URL through the shared session and returns the response. Pages
+# still within their cache lifetime are served from disk, older ones are
+# revalidated with the server. Raises FetchError if the request fails or the
+# server does not answer with 200
+# =============================================================================
+def fetch(url, params=None, timeout=None, use_cache=True):
+    if timeout==None:
+        timeout = REQUEST_TIMEOUT
+    cache = get_response_cache() if use_cache and isinstance(url, str) else None
+    entry = None
+    conditional = {}
+    if cache!=None:
+        key = normalise_url(url, params)
+        entry = cache.get(key)
+        if entry!=None:
+            if time.time()-entry['Stored']<CACHE_TTLS[url_class(key)]:
+                return CachedResponse(entry['URL'], entry['Body'], {})
+            if entry['ETag']:
+                conditional['If-None-Match'] = entry['ETag']
+            if entry['Last-Modified']:
+                conditional['If-Modified-Since'] = entry['Last-Modified']
+    limiter = request_budget
+    if limiter==None and urlsplit(url).netloc.lower()==GOVUK_HOST:
+        limiter = govuk_limiter
+    try:
+        if limiter!=None:
+            with limiter.turn(url):
+                conn = http_session.get(url, params=params, timeout=timeout, headers=conditional)
+        else:
+            conn = http_session.get(url, params=params, timeout=timeout, headers=conditional)
+    except requests.RequestException as e:
+        raise FetchError(url, type(e).__name__) from e
+    if conn.status_code==304 and entry!=None:
+        cache.touch(key)
+        return CachedResponse(entry['URL'], entry['Body'], conn.headers, revalidated=True)
+    if conn.status_code!=200:
+        raise FetchError(conn.url, f"HTTP {conn.status_code}", conn.status_code)
+    conn.from_cache = False
+    if cache!=None:
+        cache.put(key, conn.url, conn.text, conn.headers.get('ETag'), conn.headers.get('Last-Modified'))
+    return conn
+
+# =============================================================================
+# Raised inside a background job once it has been cancelled
+# =============================================================================
+class SearchCancelled(Exception):
+    pass
+
+# =============================================================================
+# Runs a function on a background thread so that the window stays responsive.
+# The function is given the job as its 'job' argument, uses check() to stop
+# once it has been cancelled and reports how far it has got with progress()
+# and advance(), and can send anything else it finds early with post().
+# Progress, the result or the error are posted to 'events' as (kind, value)
+# pairs for the window to pick up
+# =============================================================================
+class BackgroundJob:
+    def __init__(self):
+        self.events = queue.Queue()
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.started = time.monotonic()
+
+    def start(self, func, *args):
+        def run():
+            try:
+                self.events.put(('done', func(*args, job=self)))
+            except SearchCancelled:
+                self.events.put(('cancelled', None))
+            except Exception as e:
+                self.events.put(('error', e))
+        threading.Thread(target=run, name="background-job", daemon=True).start()
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise SearchCancelled()
+
+    def post(self, kind, value):
+        self.events.put((kind, value))
+
+    # Sets some of the counts and posts them
+    def progress(self, **counts):
+        with self.lock:
+            self.counts.update(counts)
+            self._post()
+
+    # Adds n to one of the counts and posts them
+    def advance(self, name, n=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+            self._post()
+
+    # Estimates the seconds left from how quickly 'Results' are reaching 'Target'
+    def eta(self):
+        done, total = self.counts.get('Results', 0), self.counts.get('Target')
+        if not total or done==0:
+            return None
+        return (time.monotonic()-self.started) / done * max(0, total-done)
+
+    def _post(self):
+        counts = dict(self.counts)
+        counts['ETA'] = self.eta()
+        self.events.put(('progress', counts))
+
+# =============================================================================
+# Parser used for every page. lxml is used if it is installed, as it is much
+# faster than Python's own html.parser
+# =============================================================================
+HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml')!=None else 'html.parser'
+
+# =============================================================================
+# Parses a page. If 'only' (a SoupStrainer) is given, only the elements it
+# matches and what is inside them are kept, which is quicker and uses less
+# memory than keeping the whole page. Trees should be decomposed once they
+# have been read so that they are freed straight away
+# =============================================================================
+def parse_html(html, only=None):
+    return BeautifulSoup(html, HTML_PARSER, parse_only=only)
+
+# =============================================================================
+# Returns a pattern that matches a class attribute containing any of the
+# classes given. It is used in SoupStrainers, which may be given the class
+# attribute before it has been split into its classes
+# =============================================================================
+def class_pattern(*classes):
+    return re.compile(r'(?:^|\s)(?:%s)(?:\s|$)' % "|".join(re.escape(c) for c in classes))
+
+# =============================================================================
+# The parts of gov.uk pages that are read
+# =============================================================================
+SEARCH_RESULTS_ONLY = SoupStrainer("div", {"class": class_pattern("finder-results")})
+RESULT_COUNT_ONLY = SoupStrainer("div", {"class": class_pattern("result-info__header")})
+ORGANISATIONS_ONLY = SoupStrainer("li", {"class": class_pattern("organisations-list__item")})
+ORG_BLOG_ONLY = SoupStrainer(["ul", "div"], {"class": class_pattern("gem-c-share-links__list", "govuk-notification-banner__content")})
+
 # Returns the URL to the departments blog page
 def get_blog(data):
   blog_link = 'None'
@@ -78,34 +813,200 @@ def get_blog(data):
       blog_link='None'
   return blog_link
 
+# =============================================================================
+# Settings for refreshing the departments from gov.uk. Organisation pages are
+# fetched on a pool of REFRESH_WORKERS threads, with at most HOST_CONCURRENCY
+# requests to the same host at once and requests to a host started at least
+# HOST_INTERVAL seconds apart
+# =============================================================================
+REFRESH_WORKERS = 8
+HOST_CONCURRENCY = 4
+HOST_INTERVAL = 0.05
+
+# =============================================================================
+# Keeps the requests made to each host within HOST_CONCURRENCY at once and
+# spaced HOST_INTERVAL seconds apart. Safe to use from several threads at once
+# =============================================================================
+class HostLimiter:
+    def __init__(self, per_host=HOST_CONCURRENCY, interval=HOST_INTERVAL):
+        self.per_host = per_host
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.slots = {}
+        self.next_start = {}
+
+    # Waits for a free slot for the host of a URL and its turn to start, and
+    # holds the slot until the block ends
+    @contextmanager
+    def turn(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self.lock:
+            slot = self.slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with slot:
+            with self.lock:
+                start = max(time.monotonic(), self.next_start.get(host, 0))
+                self.next_start[host] = start + self.interval
+            delay = start - time.monotonic()
+            if delay>0:
+                time.sleep(delay)
+            yield
+
+    # Waits for a free slot for the host of a URL and fetches it
+    def fetch(self, url, **kwargs):
+        with self.turn(url):
+            return fetch(url, **kwargs)
+
+# =============================================================================
+# Every request fetch() sends to www.gov.uk waits for a turn from
+# govuk_limiter, so however many searches are gathering results at once
+# gov.uk gets at most GOVUK_CONCURRENCY requests at a time, started at least
+# GOVUK_INTERVAL seconds apart
+# =============================================================================
+GOVUK_HOST = 'www.gov.uk'
+GOVUK_CONCURRENCY = 8
+GOVUK_INTERVAL = 0.05
+govuk_limiter = HostLimiter(GOVUK_CONCURRENCY, GOVUK_INTERVAL)
+
+# =============================================================================
+# Limits every request fetch() sends to the network when set to a
+# HostLimiter, whichever search sends it, in place of govuk_limiter. Pages served from the cache are not
+# limited. Set while saved searches are being watched (see watch_saved)
+# =============================================================================
+request_budget = None
+
+# =============================================================================
+# Returns the blog link of an organisation page. The page is fetched with a
+# conditional request, and if it has not changed since the last refresh the
+# blog link found then is used instead of parsing the page again
+# =============================================================================
+def get_org_blog(limiter, link, previous):
+  try:
+    conn = limiter.fetch(link)
+  except FetchError as err:
+    log_fetch_error(err)
+    return previous.get(link, 'None')
+  if getattr(conn, 'from_cache', False) and link in previous:
+    return previous[link]
+  data = parse_html(conn.text, ORG_BLOG_ONLY)
+  blog_link = get_blog(data)
+  data.decompose()
+  return blog_link
+
 # =============================================================================
 # Returns a list of all the departments info from gov.uk (Department name, URL
-# to gov.uk page, and the URL to their corresponding blog page, takes about 10 
-# mins to complete)
+# to gov.uk page, and the URL to their corresponding blog page). previous is
+# the list from the last refresh, whose blog links are reused for pages that
+# have not changed
 # =============================================================================
-def all_deps_ukgov():
-  html = requests.get("https://www.gov.uk/government/organisations", headers=headers).text
-  soup = BeautifulSoup(html, 'html.parser')
-  result = []
+def all_deps_ukgov(previous=None, max_workers=None):
+  if max_workers==None:
+    max_workers = REFRESH_WORKERS
+  known = {}
+  for elem in flatten_deps(previous or []):
+    known[elem['Link']] = elem['Blog Link']
+  html = fetch("https://www.gov.uk/government/organisations").text
+  soup = parse_html(html, ORGANISATIONS_ONLY)
+  groups = []
   for i in soup.find_all('li', {'class': 'organisations-list__item'}):
     links = []
     for j in i.find_all('a'):
       title = j.text.replace("\r\n", "").strip("\n")
-      title_link = f"https://www.gov.uk{j['href']}"
-      blog_html = requests.get(title_link, headers=headers).text
-      data = BeautifulSoup(blog_html, 'html.parser')
-      blog_link, only_blog = get_blog(data)
-      entry = {'Title': title, 'Link': title_link, 'Blog Link': blog_link, 'Only Blog': only_blog}
-      if len(links)==0:
-        entry['Works with'] = []
-        links.append(entry)
-      elif len(links)==1:
-        links[0]['Works with'].append(entry)
-    if len(links[0]['Works with'])==0:
-      links[0]['Works with'] = 'None'
+      links.append({'Title': title, 'Link': f"https://www.gov.uk{j['href']}"})
+    if len(links)>0:
+      groups.append(links)
+  limiter = HostLimiter()
+  with ThreadPoolExecutor(max_workers=max_workers) as pool:
+    blog_links = {link: pool.submit(get_org_blog, limiter, link, known)
+                  for link in {entry['Link'] for links in groups for entry in links}}
+    for links in groups:
+      for entry in links:
+        entry['Blog Link'] = blog_links[entry['Link']].result()
+  result = []
+  for links in groups:
+    links[0]['Works with'] = links[1:] if len(links)>1 else 'None'
     result.append(links[0])
   return result
 
+# =============================================================================
+# Returns every department, agency and public body in a list of departments
+# =============================================================================
+def flatten_deps(df):
+  result = []
+  for elem in df:
+    result.append(elem)
+    if elem['Works with']!='None':
+      result.extend(elem['Works with'])
+  return result
+
+# =============================================================================
+# Returns the bodies that were added, removed or renamed (same gov.uk page but
+# a different name) between two lists of departments
+# =============================================================================
+def deps_diff(old, new):
+  old_titles = {elem['Link']: elem['Title'] for elem in flatten_deps(old)}
+  new_titles = {elem['Link']: elem['Title'] for elem in flatten_deps(new)}
+  return {
+      'Added': sorted(new_titles[link] for link in new_titles if link not in old_titles),
+      'Removed': sorted(old_titles[link] for link in old_titles if link not in new_titles),
+      'Renamed': sorted((old_titles[link], new_titles[link]) for link in new_titles
+                        if link in old_titles and old_titles[link]!=new_titles[link]),
+  }
+
+# =============================================================================
+# Writes a list of departments to a CSV file in the form read by all_deps_csv.
+# The file is written under a temporary name first, so it is never left half
+# written
+# =============================================================================
+def write_deps_csv(df, path='dataset.csv'):
+  rows = []
+  for elem in df:
+    row = {k: elem[k] for k in ('Title', 'Link', 'Blog Link')}
+    row['Works with'] = [] if elem['Works with']=='None' else elem['Works with']
+    rows.append(row)
+  pd.DataFrame(rows).to_csv(path+".tmp", index=False)
+  os.replace(path+".tmp", path)
+
+# =============================================================================
+# Retrieves the departments from gov.uk, replaces 'dataset.csv' with them and
+# prints which bodies were added, removed or renamed. Returns the departments
+# and that report
+# =============================================================================
+def refresh_deps(path='dataset.csv', max_workers=None):
+  try:
+    previous = all_deps_csv(path)
+  except (OSError, IndexError, KeyError):
+    previous = []
+  started = time.monotonic()
+  df = all_deps_ukgov(previous, max_workers)
+  if len(df)==0:
+    raise ValueError("No organisations were found on gov.uk")
+  report = deps_diff(previous, df)
+  write_deps_csv(df, path)
+  print(f"Departments refreshed in {time.monotonic()-started:.1f}s: "
+        f"{len(report['Added'])} added, {len(report['Removed'])} removed, {len(report['Renamed'])} renamed")
+  for title in report['Added']:
+    print(f"  + {title}")
+  for title in report['Removed']:
+    print(f"  - {title}")
+  for old, new in report['Renamed']:
+    print(f"  ~ {old} -> {new}")
+  return df, report
+
+# =============================================================================
+# Refreshes 'dataset.csv' in a background thread so the tool can start with
+# the current departments. The refreshed departments are used from the next
+# time the tool starts
+# =============================================================================
+def start_deps_refresh(path='dataset.csv'):
+  def run():
+    try:
+      refresh_deps(path)
+    except (FetchError, ValueError, OSError) as e:
+      print(f"Could not refresh the departments: {e}")
+  thread = threading.Thread(target=run, name="deps-refresh", daemon=True)
+  thread.start()
+  return thread
+
 # =============================================================================
 # Takes a dictionary in the form of a string and converts it back to a 
 # dicitonary
@@ -137,8 +1038,8 @@ def format_list_dicts(s):
 # Returns the same information as all_deps_ukgov but from a locally stored csv 
 # file, making it quicker.
 # =============================================================================
-def all_deps_csv():
-    with open('dataset.csv') as f:
+def all_deps_csv(path='dataset.csv'):
+    with open(path) as f:
       a = [{k: v for k, v in row.items()} for row in csv.DictReader(f, skipinitialspace=True)]
     for i in range(len(a)):
       if a[i]['Works with']=="[]":
@@ -168,131 +1069,827 @@ def all_deps_csv():
 #     print("Done!")
 
 # =============================================================================
-# Reads 'read_blogs.csv' and returns dataset containing necessary information
-# to retrieve information from those blog pages
+# Raised when a row of 'read_blogs.csv' cannot be turned into a BlogSpec.
+# 'problems' lists everything that is wrong with the row
 # =============================================================================
-def read_all_blogs():
-    with open('read_blogs.csv') as f:
-        all_blogs = [{k: v for k, v in row.items()} for row in csv.DictReader(f, skipinitialspace=True)]
-    for i in range(len(all_blogs)):
-        pages = all_blogs[i]['Page'].split(" ")
+class BlogSpecError(ValueError):
+    def __init__(self, title, problems):
+        super().__init__(f"{title}: {'; '.join(problems)}")
+        self.title = title
+        self.problems = problems
+
+# =============================================================================
+# Returns None if a cell of 'read_blogs.csv' is empty or 'None', otherwise the
+# cell without surrounding whitespace
+# =============================================================================
+def blog_cell(row, column):
+    value = (row.get(column) or '').strip()
+    if value in ('', 'None'):
+        return None
+    return value
+
+# =============================================================================
+# How to search one blog website and read its results, checked and compiled
+# once from a row of 'read_blogs.csv'. The columns used are:
+#   Blog Link / Search - the website and the path of its search page
+#   Keywords - the query parameter the search terms are sent in
+#   Page - "<parameter> <first page>", or "AFTER <text>" when the page number
+#          follows some text in the URL
+#   Page Increment - how much the page number goes up by for each page
+#   Results - "<tag> <class>" of the element holding the results, and on the
+#             next line the tag of each result link
+#   Date - "<tag> <class>" of the date of each result, or None
+#   Number - "<tag> <class> <word>" of the element holding the number of
+#            results and which word of its text it is, or MANUAL to count the
+#            results page by page
+#   Format - how the search URL is built, only "+" is supported
+#   Search Link - links starting with this lead back to the search rather than
+#                 to a result, or None
+#   Published Before / Published After - the query parameter that limits the
+#                 results by date, optionally followed by the strftime format
+#                 of the date (%Y-%m-%d if not given), or None
+#   Order by - Oldest / Newest / Relevance - "<parameter> || <value>" that
+#                 orders the results that way, or None
+#   Default Order - how the results are ordered when no order is sent, one of
+#                 Newest First, Oldest First or Relevance, or None if unknown
+# Raises BlogSpecError if any of these cannot be used
+# =============================================================================
+class BlogSpec:
+    def __init__(self, row):
+        problems = []
+        self.row = dict(row)
+        self.title = (row.get('Title') or '').strip()
+        self.link = blog_cell(row, 'Blog Link') or ''
+        if not self.link.startswith('http'):
+            problems.append("'Blog Link' is not a URL")
+        elif not self.link.endswith('/'):
+            self.link += '/'
+        self.search = (row.get('Search') or '').strip()
+        self.keywords = blog_cell(row, 'Keywords')
+        if self.keywords==None:
+            problems.append("'Keywords' is empty")
+        if blog_cell(row, 'Format')!='+':
+            problems.append("'Format' is not +")
+
+        page = (row.get('Page') or '').split()
+        self.page_param, self.first_page, self.page_after = None, None, None
+        if len(page)!=2:
+            problems.append("'Page' is not '<parameter> <first page>' or 'AFTER <text>'")
+        elif page[0]=='AFTER':
+            self.page_after = page[1]
+        elif not page[1].isdigit():
+            problems.append("the first page in 'Page' is not a number")
+        else:
+            self.page_param, self.first_page = page
         try:
-            all_blogs[i]['Page Increment'] = int(all_blogs[i]['Page Increment'])
-        except:
-            pass
-        if len(pages)>1:
-            all_blogs[i]['Page'] = pages
-    return all_blogs[:12]#----------REMOVE [:12] ONCE ALL BLOG DATA IS FILLED--------------------------------
-#------------------------------------------------------------------------------------------------------------
+            self.page_increment = int(row.get('Page Increment'))
+        except (TypeError, ValueError):
+            problems.append("'Page Increment' is not a number")
+
+        lines = [line.split() for line in (row.get('Results') or '').split("\n") if line.strip()]
+        if len(lines)<2 or len(lines[0])<2:
+            problems.append("'Results' is not '<tag> <class>' followed by a line with the tag of the links")
+        else:
+            self.results_tag, self.results_class = lines[0][0], " ".join(lines[0][1:])
+            self.link_tag = lines[1][0]
+
+        self.date_tag, self.date_class = None, None
+        date = blog_cell(row, 'Date')
+        if date!=None:
+            words = date.split()
+            if len(words)<2:
+                problems.append("'Date' is not '<tag> <class>'")
+            else:
+                self.date_tag, self.date_class = words[0], " ".join(words[1:])
 
+        number = blog_cell(row, 'Number')
+        self.manual_count = number=='MANUAL'
+        if not self.manual_count:
+            words = (number or '').split()
+            try:
+                self.number_tag, self.number_class, self.number_word = words[0], " ".join(words[1:-1]), int(words[-1])
+                if len(words)<3:
+                    raise ValueError()
+            except (IndexError, ValueError):
+                problems.append("'Number' is not '<tag> <class> <word>' or MANUAL")
 
-try:
-    df = all_deps_csv()
-except:
-    df = all_deps_ukgov()
-    pd.DataFrame(df).to_csv('dataset.csv', index=False)
+        self.search_link = blog_cell(row, 'Search Link')
 
-all_blogs = read_all_blogs()
-blog_titles = []
-for elem in all_blogs:
-    blog_titles.append(elem['Title'])
+        self.date_params = {}
+        for column in ('Published Before', 'Published After'):
+            words = (blog_cell(row, column) or '').split(" ", 1)
+            if words[0]!='':
+                self.date_params[column] = (words[0], words[1] if len(words)>1 else '%Y-%m-%d')
+        self.order_params = {}
+        for column, sort_by in (('Order by - Oldest', 'Oldest First'), ('Order by - Newest', 'Newest First'),
+                                ('Order by - Relevance', 'Relevance')):
+            order = blog_cell(row, column)
+            if order==None:
+                continue
+            if " || " not in order:
+                problems.append(f"'{column}' is not '<parameter> || <value>'")
+            else:
+                self.order_params[sort_by] = tuple(order.split(" || ", 1))
+        self.default_order = blog_cell(row, 'Default Order')
+        if self.default_order not in (None, 'Newest First', 'Oldest First', 'Relevance'):
+            problems.append("'Default Order' is not Newest First, Oldest First or Relevance")
+        if len(problems)>0:
+            raise BlogSpecError(self.title or "Untitled blog", problems)
 
+    def __repr__(self):
+        return f"BlogSpec({self.title!r})"
 
+    # Returns the query parameters of the first page of a search. The dates
+    # (DD/MM/YYYY) and order are only sent if the blog supports them
+    def search_params(self, search_terms, sdate=None, edate=None, sort_by=None):
+        params = {self.keywords: search_terms}
+        if self.page_param!=None:
+            params[self.page_param] = self.first_page
+        for column, date in (('Published After', sdate), ('Published Before', edate)):
+            if date!=None and column in self.date_params:
+                name, fmt = self.date_params[column]
+                params[name] = datetime.strptime(date, '%d/%m/%Y').strftime(fmt)
+        if sort_by in self.order_params:
+            name, value = self.order_params[sort_by]
+            params[name] = value
+        return params
 
-#---------------------- Grey Literature Search Tool ---------------------------
+    # Removes the results of a page that are outside the date range (DD/MM/YYYY,
+    # either may be None). Results without a date are kept. Returns the
+    # results that are kept and whether the page has gone past the start date
+    # of a newest first listing, after which no later page can be in range.
+    # The listing is newest first if that order was sent, or if no order was
+    # sent and the blog's default order is newest first
+    def in_date_range(self, results, sdate=None, edate=None, sort_by=None):
+        start = sortable_date(sdate) if sdate!=None else None
+        end = sortable_date(edate) if edate!=None else None
+        kept = []
+        oldest = None
+        for elem in results:
+            date = sortable_date(elem['Date Published'])
+            if date==(0, 0, 0):
+                kept.append(elem)
+                continue
+            oldest = date if oldest==None else min(oldest, date)
+            if (start==None or date>=start) and (end==None or date<=end):
+                kept.append(elem)
+        if start==None or oldest==None:
+            return kept, False
+        listing = sort_by if sort_by in self.order_params else self.default_order
+        return kept, listing=='Newest First' and oldest<start
+
+    # Returns the link to the page of results 'pages' pages after the one
+    # given, or None if the page number cannot be found in the link
+    def page_link(self, link, pages):
+        if self.page_after!=None:
+            return next_page_inner(link, self.page_after, self.page_increment*pages)
+        pattern = r'([?&]' + re.escape(self.page_param) + r'=)(\d+)'
+        if re.search(pattern, link)==None:
+            return None
+        return re.sub(pattern, lambda m: m.group(1)+str(int(m.group(2))+self.page_increment*pages), link, count=1)
+
+    # Returns the link to the page of results after the one given
+    def next_page(self, link):
+        return self.page_link(link, 1)
+
+    # Returns the number of results given on a search page, raises ValueError
+    # if it cannot be found
+    def count(self, soup):
+        i = soup.find(self.number_tag, {'class': self.number_class})
+        if i==None:
+            raise ValueError(f"No number of results found for {self.title}")
+        return int(i.text.strip().split(" ")[self.number_word].strip().replace(',', ''))
+
+    # Returns the number of results from the html of a search page, parsing
+    # only the element that shows it
+    def count_from_html(self, html):
+        soup = parse_html(html, SoupStrainer(self.number_tag, {'class': class_pattern(*self.number_class.split())}))
+        try:
+            return self.count(soup)
+        finally:
+            soup.decompose()
+
+    # Returns the element of a search page that holds the results, or None
+    def results_element(self, soup):
+        return soup.find(self.results_tag, {'class': self.results_class})
+
+    # Returns a SoupStrainer that keeps only the elements of a search page that
+    # may hold the results
+    def results_only(self):
+        return SoupStrainer(self.results_tag, {'class': class_pattern(*self.results_class.split())})
+
+    # Returns True if a link found among the results leads back to the search
+    def is_search_link(self, href):
+        return self.search_link!=None and (href.startswith('#') or href.startswith(self.search_link))
+
+    # Returns the full URL of a link found on the website
+    def absolute(self, href):
+        if 'http' in href[:6]:
+            return href
+        return self.link + href.lstrip('/')
+
+    # Returns a date found on a search page (e.g. "5 March 24") as DD/MM/YYYY,
+    # or "N/A" if it cannot be read
+    def parse_date(self, text):
+        words = text.strip().split(" ")
+        try:
+            if len(words[2])==2:
+                words[2] = "20"+words[2]
+            words[1] = words[1][:3]
+            return datetime.strptime(" ".join(words[:3]), '%d %b %Y').strftime('%d/%m/%Y')
+        except (IndexError, ValueError):
+            return "N/A"
 
 # =============================================================================
-# Find and returns the date in which a gov.uk page was first published
+# Compiles every row of 'read_blogs.csv'. Returns the BlogSpecs of the rows
+# that can be used, a BlogSpecError for every row that cannot, and the titles
+# of the rows that have not been filled in yet
 # =============================================================================
-def get_og_gov_date(link):
-    date = "N/A"
-    try:
-        html = requests.get(link, headers=headers).text
-        soup = BeautifulSoup(html, 'html.parser')
-        date = str(soup.find('meta', {'name': 'govuk:first-published-at'})).split("\"")[1][:10].split("-")
-        date = "/".join([date[2], date[1], date[0]])
-    except:
-        pass
-    return date
+BLOG_SPEC_COLUMNS = ('Search', 'Keywords', 'Page', 'Results', 'Number', 'Format')
+
+def compile_blogs(path='read_blogs.csv'):
+    specs = []
+    errors = []
+    unfinished = []
+    with open(path) as f:
+        for row in csv.DictReader(f, skipinitialspace=True):
+            if all(blog_cell(row, column)==None for column in BLOG_SPEC_COLUMNS):
+                unfinished.append(row['Title'])
+                continue
+            try:
+                specs.append(BlogSpec(row))
+            except BlogSpecError as err:
+                errors.append(err)
+    return specs, errors, unfinished
 
 # =============================================================================
-# Returns the search URL given the search criteria set by the user
+# Reads 'read_blogs.csv' and returns the rows that can be used to retrieve
+# results from those blog pages (see BlogSpec). Rows that cannot be used are
+# skipped
 # =============================================================================
-def govuk_pubs_link(df, search_terms, from_date=None, end_date=None, sort_by=None):
-  orgs = []
-  url_search = "+".join(search_terms.split(" "))
-  for i in range(len(df)):
-    link = df[i]['Link']
-    org = link.split("/")[-1]
-    orgs.append(org)
-  URL = "https://www.gov.uk/search/all?"
-  for org in orgs:
-    URL += f"&organisations[]={org}"
-  if sort_by=="Relevance":
-      URL += "&order=relevance"
-  elif sort_by=="Newest First":
-      URL += "&order=updated-newest"
-  elif sort_by=="Newest First":
-      URL += "&order=updated-oldest"
-  else:
-      URL += "&order=relevance"
-  URL += f"&keywords={url_search}"
-  if from_date!=None and end_date!=None:
-    URL += f"&public_timestamp%5Bfrom%5D={from_date}&public_timestamp%5Bto%5D={end_date}"
-  elif from_date!=None:
-      URL += f"&public_timestamp%5Bfrom%5D={from_date}"
-  elif end_date!=None:
-      URL += f"&public_timestamp%5Bto%5D={end_date}"
-  URL += "&page=1"
-  return URL
+def read_all_blogs():
+    specs, errors, unfinished = compile_blogs()
+    for err in errors:
+        print(f"Blog skipped, {err}")
+    return [spec.row for spec in specs]
 
 # =============================================================================
-# Returns the authors of the literature provided by the link
-# =============================================================================
-def get_author_deps(link):
-  html = requests.get(link, headers=headers).text
-  data = BeautifulSoup(html, 'html.parser')
-  deps = []
-  parent = data.find("body").find_all("li", {"class": "organisation-logos__logo"})
-  for elem in parent:
-    department = elem.text.strip()
-    if department not in titles:
-      words = re.split(r'(?<=[a-z])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])', department)
-      department = ' '.join(words)
-      if department in titles:
-        deps.append(department)
-    else:
-      deps.append(department)
-  if len(deps)==0:
+# Prints which rows of 'read_blogs.csv' cannot be used and why. Returns 1 if
+# any row is broken, otherwise 0 (run with 'python main_project.py
+# --check-blogs')
+# =============================================================================
+def check_blog_specs(path='read_blogs.csv'):
+    specs, errors, unfinished = compile_blogs(path)
+    for err in errors:
+        print(f"BROKEN  {err.title}")
+        for problem in err.problems:
+            print(f"        - {problem}")
+    print(f"{len(specs)} blog(s) ready, {len(errors)} broken, {len(unfinished)} not filled in yet")
+    return 1 if len(errors)>0 else 0
+#------------------------------------------------------------------------------------------------------------
+
+
+# =============================================================================
+# The departments in 'dataset.csv' and the blogs in 'read_blogs.csv' are
+# compiled into a snapshot file together with the lists and indexes the tool
+# needs, so that starting the tool only has to load that one file. The
+# snapshot is rebuilt automatically whenever either CSV file changes
+# =============================================================================
+CATALOGUE_PATH = 'catalogue.pickle'
+CATALOGUE_VERSION = 5
+CATALOGUE_SOURCES = ('dataset.csv', 'read_blogs.csv')
+ASSOCIATED_MARKER = "All associated agencies and public bodies below"
+
+# =============================================================================
+# Returns the modification times of the files the catalogue is built from
+# =============================================================================
+def catalogue_source_times():
+    return {path: os.stat(path).st_mtime_ns for path in CATALOGUE_SOURCES}
+
+# =============================================================================
+# Builds the catalogue from the departments and blogs. It contains:
+#   titles - the rows shown on the front page, with a marker row above the
+#            agencies and public bodies that work with a department
+#   title_records - the department of every row in titles (None for markers)
+#   full_df - every department, agency and public body
+#   children - the rows of the agencies and public bodies below each marker row
+#   departments - the rows of the departments themselves
+#   groups - the marker row below each department that has one
+#   title_words - every (word, row) pair in the titles, sorted, used to find
+#                 titles by the start of their words
+#   title_keys - every title in lower case, used to find titles containing
+#                some text
+#   title_index - the department for each title
+#   blog_rows - the rows of 'read_blogs.csv' that can be used
+# Only plain lists and dicts are kept, so that the snapshot can be loaded
+# whether the tool is run as a script or imported. The blogs are compiled
+# from blog_rows once it has been loaded (see add_blogs)
+# =============================================================================
+def compile_catalogue(df, blog_rows):
+    titles = []
+    title_records = []
+    full_df = []
+    children = {}
+    departments = []
+    groups = {}
+    title_index = {}
+    for elem in df:
+        departments.append(len(titles))
+        titles.append(elem['Title'])
+        title_records.append(elem)
+        full_df.append(elem)
+        title_index.setdefault(elem['Title'].strip(), elem)
+        if elem['Works with']!='None':
+            marker = len(titles)
+            groups[departments[-1]] = marker
+            titles.append(ASSOCIATED_MARKER)
+            title_records.append(None)
+            children[marker] = []
+            for worker in elem['Works with']:
+                children[marker].append(len(titles))
+                titles.append(f"\t{worker['Title']}")
+                title_records.append(worker)
+                full_df.append(worker)
+                title_index.setdefault(worker['Title'].strip(), worker)
+    title_words = sorted({(word, row) for row, title in enumerate(titles) if title_records[row]!=None
+                          for word in re.findall(r"\w+", title.lower())})
+    return {
+        'Version': CATALOGUE_VERSION,
+        'df': df,
+        'titles': titles,
+        'title_records': title_records,
+        'full_df': full_df,
+        'children': children,
+        'departments': departments,
+        'groups': groups,
+        'title_words': title_words,
+        'title_keys': [title.strip().lower() for title in titles],
+        'title_index': title_index,
+        'blog_rows': blog_rows,
+    }
+
+# =============================================================================
+# Compiles the blogs of a catalogue into BlogSpecs, adding them as
+# 'all_blogs', their titles as 'blog_titles' and the blog for each title as
+# 'blog_index'. Returns the catalogue
+# =============================================================================
+def add_blogs(catalogue):
+    all_blogs = [BlogSpec(row) for row in catalogue['blog_rows']]
+    blog_index = {}
+    for blog in all_blogs:
+        blog_index.setdefault(blog.title, blog)
+    catalogue['all_blogs'] = all_blogs
+    catalogue['blog_titles'] = [blog.title for blog in all_blogs]
+    catalogue['blog_index'] = blog_index
+    return catalogue
+
+# =============================================================================
+# Reads both CSV files and writes a new catalogue snapshot. If 'dataset.csv'
+# cannot be read, the departments are retrieved from gov.uk instead
+# =============================================================================
+def build_catalogue_snapshot(path=CATALOGUE_PATH):
     try:
-      parent = data.find("body").find("dd", {"class": "gem-c-metadata__definition"}).find_all("a", {"class": "govuk-link"})
-    except:
-      try:
-        parent = data.find("body").find("div", {"class": "organisations-list"}).find_all("a", {"class": "govuk-link"})
-      except:
+        df = all_deps_csv()
+    except (OSError, IndexError, KeyError):
+        df, report = refresh_deps()
+    catalogue = compile_catalogue(df, read_all_blogs())
+    catalogue['Sources'] = catalogue_source_times()
+    try:
+        with open(path+".tmp", 'wb') as f:
+            pickle.dump(catalogue, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path+".tmp", path)
+    except OSError as e:
+        print(f"Could not write the catalogue snapshot: {e}")
+    return add_blogs(catalogue)
+
+# =============================================================================
+# Returns the catalogue from the snapshot, rebuilding the snapshot first if it
+# is missing, from an older version of the tool or older than the CSV files
+# =============================================================================
+def load_catalogue(path=CATALOGUE_PATH):
+    try:
+        sources = catalogue_source_times()
+        with open(path, 'rb') as f:
+            catalogue = pickle.load(f)
+        if catalogue['Version']==CATALOGUE_VERSION and catalogue['Sources']==sources:
+            return add_blogs(catalogue)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, KeyError, TypeError):
+        pass
+    return build_catalogue_snapshot(path)
+
+# =============================================================================
+# Returns the rows of the titles in the catalogue that match some text, in the
+# order they are listed. Every word of the text has to be the start of a word
+# in the title; if no title matches that way, titles containing the text are
+# returned instead. Returns None if the text has no words
+# =============================================================================
+def match_titles(catalogue, text):
+    words = re.findall(r"\w+", text.lower())
+    if len(words)==0:
+        return None
+    index = catalogue['title_words']
+    rows = None
+    for word in words:
+        found = set()
+        i = bisect.bisect_left(index, (word,))
+        while i<len(index) and index[i][0].startswith(word):
+            found.add(index[i][1])
+            i += 1
+        rows = found if rows==None else rows & found
+    if len(rows)==0:
+        text = text.strip().lower()
+        rows = {row for row, key in enumerate(catalogue['title_keys'])
+                if text in key and catalogue['title_records'][row]!=None}
+    return sorted(rows)
+
+# Checks 'read_blogs.csv' without starting the tool
+if __name__=="__main__" and sys.argv[1:]==['--check-blogs']:
+    sys.exit(check_blog_specs())
+
+catalogue = load_catalogue()
+# Set GREY_REVIEW_REFRESH_DEPS to check gov.uk for new departments while the tool runs
+if os.environ.get('GREY_REVIEW_REFRESH_DEPS') is not None:
+    start_deps_refresh()
+df = catalogue['df']
+all_blogs = catalogue['all_blogs']
+blog_titles = catalogue['blog_titles']
+
+
+
+#---------------------- Grey Literature Search Tool ---------------------------
+
+# =============================================================================
+# Returns the first published date (DD/MM/YYYY) from the html of a gov.uk
+# page, or "N/A" if the page does not have one. The date is in a meta tag in
+# the head of the page, so it is found without parsing the page
+# =============================================================================
+FIRST_PUBLISHED_TAG = re.compile(r'<meta[^>]*name="govuk:first-published-at"[^>]*>')
+FIRST_PUBLISHED_DATE = re.compile(r'content="(\d{4})-(\d{2})-(\d{2})')
+
+def first_published_date(html):
+    tag = FIRST_PUBLISHED_TAG.search(html)
+    date = FIRST_PUBLISHED_DATE.search(tag.group(0)) if tag!=None else None
+    if date==None:
+        return "N/A"
+    return f"{date.group(3)}/{date.group(2)}/{date.group(1)}"
+
+# =============================================================================
+# Returns the search URL given the search criteria set by the user
+# =============================================================================
+def govuk_pubs_link(df, search_terms, from_date=None, end_date=None, sort_by=None):
+  url_search = "+".join(search_terms.split(" "))
+  orgs = govuk_org_slugs(df)
+  URL = "https://www.gov.uk/search/all?"
+  for org in orgs:
+    URL += f"&organisations[]={org}"
+  if sort_by=="Relevance":
+      URL += "&order=relevance"
+  elif sort_by=="Newest First":
+      URL += "&order=updated-newest"
+  elif sort_by=="Oldest First":
+      URL += "&order=updated-oldest"
+  else:
+      URL += "&order=relevance"
+  URL += f"&keywords={url_search}"
+  if from_date!=None and end_date!=None:
+    URL += f"&public_timestamp%5Bfrom%5D={from_date}&public_timestamp%5Bto%5D={end_date}"
+  elif from_date!=None:
+      URL += f"&public_timestamp%5Bfrom%5D={from_date}"
+  elif end_date!=None:
+      URL += f"&public_timestamp%5Bto%5D={end_date}"
+  URL += "&page=1"
+  return URL
+
+# =============================================================================
+# Returns the gov.uk organisation slugs (the last part of their gov.uk URL) of
+# the given departments
+# =============================================================================
+def govuk_org_slugs(df):
+    return [elem['Link'].split("/")[-1] for elem in df]
+
+# =============================================================================
+# Settings for the gov.uk Search API backend. 'api' searches through the JSON
+# search API, 'html' scrapes the search pages of the gov.uk website instead.
+# GOVUK_SEARCH_API can point at a local fixture server to work offline
+# (see fixture_server.py)
+# =============================================================================
+SEARCH_BACKEND = os.environ.get('GREY_REVIEW_SEARCH_BACKEND', 'api')
+GOVUK_SEARCH_API = os.environ.get('GREY_REVIEW_SEARCH_API', 'https://www.gov.uk/api/search.json')
+SEARCH_API_PAGE_SIZE = 200
+SEARCH_API_FIELDS = ['title', 'link', 'description', 'public_timestamp', 'organisations']
+# The Search API only gives when a document was last updated. Set
+# GREY_REVIEW_API_FIRST_PUBLISHED to also read the first published date of
+# each result from its document page, which takes one request per result
+API_FIRST_PUBLISHED = os.environ.get('GREY_REVIEW_API_FIRST_PUBLISHED') is not None
+
+# =============================================================================
+# Converts a DD/MM/YYYY date to the YYYY-MM-DD format used by the Search API
+# =============================================================================
+def iso_date(date):
+    d = date.split("/")
+    return f"{d[2]}-{d[1]}-{d[0]}"
+
+# =============================================================================
+# Returns the Search API URL given the search criteria set by the user. Only
+# the fields that are displayed are requested
+# =============================================================================
+def govuk_api_link(df, search_terms, from_date=None, end_date=None, sort_by=None, start=0, count=None):
+    if count==None:
+        count = SEARCH_API_PAGE_SIZE
+    params = {
+        'q': search_terms,
+        'filter_organisations[]': govuk_org_slugs(df),
+        'fields[]': SEARCH_API_FIELDS,
+    }
+    if sort_by=="Newest First":
+        params['order'] = '-public_timestamp'
+    elif sort_by=="Oldest First":
+        params['order'] = 'public_timestamp'
+    dates = []
+    if from_date!=None:
+        dates.append(f"from:{iso_date(from_date)}")
+    if end_date!=None:
+        dates.append(f"to:{iso_date(end_date)}")
+    if len(dates)>0:
+        params['filter_public_timestamp'] = ",".join(dates)
+    params['count'] = count
+    params['start'] = start
+    return GOVUK_SEARCH_API + "?" + urlencode(params, doseq=True)
+
+# =============================================================================
+# Returns True if the link is a Search API link rather than a search page
+# =============================================================================
+def is_api_link(link):
+    return link.startswith(GOVUK_SEARCH_API)
+
+# =============================================================================
+# Longest search link sent to gov.uk. Searches through more organisations than
+# fit in one link are split into shards that are searched at the same time
+# =============================================================================
+GOVUK_MAX_URL_LENGTH = 2000
+
+# =============================================================================
+# Splits the departments into shards whose search links, made by make_link
+# from a list of departments, are no longer than GOVUK_MAX_URL_LENGTH. Each
+# organisation adds the same length to a link wherever it is, so the links
+# are only made once per department to measure them
+# =============================================================================
+def shard_orgs(df, make_link):
+    base = len(make_link([]))
+    shards = []
+    current = []
+    length = base
+    for elem in df:
+        extra = len(make_link([elem])) - base
+        if len(current)>0 and length+extra>GOVUK_MAX_URL_LENGTH:
+            shards.append(current)
+            current = []
+            length = base
+        current.append(elem)
+        length += extra
+    if len(current)>0 or len(shards)==0:
+        shards.append(current)
+    return shards
+
+# =============================================================================
+# Returns the search links (one per shard of organisations) for the backend
+# that is switched on. If the Search API cannot be reached it falls back to
+# the search pages of the website
+# =============================================================================
+def govuk_search_links(df, search_terms, from_date=None, end_date=None, sort_by=None):
+    if SEARCH_BACKEND=='api':
+        make_link = lambda shard: govuk_api_link(shard, search_terms, from_date, end_date, sort_by)
+        links = [make_link(shard) for shard in shard_orgs(df, make_link)]
         try:
-          parent = data.find("body").find("div", {"class": "gem-c-organisation-logo brand--executive-office"}).find_all("span", {"class": "gem-c-organisation-logo__name"})
-        except:
-            try:
-                parent = data.find("body").find("div", {"class": "govuk-!-width-one-half govuk-!-margin-top-3 responsive-bottom-margin"}).find_all("span", {"class": "gem-c-organisation-logo__name"})
-            except:
-                try:
-                    parent = data.find("body").find("div", {"class": "gem-c-organisation-logo brand--attorney-generals-office"}).find_all("span", {"class": "gem-c-organisation-logo__name"})
-                except:
-                    return deps
-    for elem in parent:
-      department = elem.text.strip()
-      deps.append(department)
-  return deps
+            get_api_page(links[0], remember=True)
+            return links
+        except FetchError as err:
+            log_fetch_error(err)
+        except ValueError:
+            print("Search API returned an unreadable response, using the search pages instead")
+    make_link = lambda shard: govuk_pubs_link(shard, search_terms, from_date, end_date, sort_by)
+    return [make_link(shard) for shard in shard_orgs(df, make_link)]
+
+# =============================================================================
+# Search pages retrieved while counting the results, with when they were
+# retrieved, kept so that the Harvester can start from them instead of
+# fetching them again. Each page is only used once by a Harvester, and none
+# is kept for longer than search pages are cached for
+# =============================================================================
+counted_pages = {}
+counted_pages_lock = threading.Lock()
+COUNTED_PAGES_KEPT = 16
+
+# =============================================================================
+# Returns the text of a search page, reusing it if it was retrieved while
+# counting. If remember is True the page is kept for the Harvester, otherwise
+# a page kept while counting is given up once it has been read
+# =============================================================================
+def search_page_text(link, remember=False):
+    with counted_pages_lock:
+        kept = counted_pages.get(link) if remember else counted_pages.pop(link, None)
+    text = None
+    if kept!=None and time.time()-kept[0]<CACHE_TTLS['search']:
+        text = kept[1]
+    if text==None:
+        text = fetch(link).text
+        kept = (time.time(), text)
+    if remember:
+        with counted_pages_lock:
+            counted_pages[link] = kept
+            while len(counted_pages)>COUNTED_PAGES_KEPT:
+                counted_pages.pop(next(iter(counted_pages)))
+    return text
+
+# =============================================================================
+# Retrieves and decodes one page of Search API results
+# =============================================================================
+def get_api_page(link, remember=False):
+    data = json.loads(search_page_text(link, remember))
+    if 'results' not in data or 'total' not in data:
+        raise ValueError("Not a Search API response")
+    return data
+
+# =============================================================================
+# Returns a list containing the literature from one page of Search API results
+# =============================================================================
+def get_list_govuk_api(df, data):
+    result = []
+    for doc in data['results']:
+        link = doc.get('link', '')
+        if not link.startswith('http'):
+            link = f"https://www.gov.uk{link}"
+        authors = [org['title'] for org in doc.get('organisations', []) if org.get('title')]
+        if len(authors)==0:
+            authors = author_resolver.page_title(link) or "N/A"
+        # The Search API only gives the latest public timestamp, so the first
+        # published date is left for the Harvester to read from the document
+        # page (see API_FIRST_PUBLISHED)
+        updated = "N/A"
+        try:
+            p = datetime.strptime(doc['public_timestamp'][:10], '%Y-%m-%d')
+            updated = f"{p.day} {p.strftime('%B %Y')}"
+        except (KeyError, TypeError, ValueError):
+            pass
+        result.append({
+            "Title": doc.get('title', 'N/A').strip(),
+            "URL": link,
+            "Departments, Agencies, and Public bodies": authors,
+            "Abstract": (doc.get('description') or 'None').strip(),
+            "Last Updated": updated,
+            "Date Published": "N/A",
+        })
+    return result
 
 # =============================================================================
-# Returns a list containing all the related literature from the html data given
+# Returns the total number of gov.uk results for a search link of either backend
 # =============================================================================
-def get_list_govuk(df, data):
+def govuk_result_count(link):
+    if is_api_link(link):
+        return int(get_api_page(link, remember=True)['total'])
+    html = search_page_text(link, remember=True)
+    data = parse_html(html, RESULT_COUNT_ONLY)
+    try:
+        no_results = data.find("div", {"class": "result-info__header"}).text.strip().split(" ")
+    finally:
+        data.decompose()
+    return int(no_results[0].replace(',',''))
+
+# =============================================================================
+# Returns the total number of gov.uk results of every shard of a search,
+# counted at the same time. A document from organisations in more than one
+# shard is counted once for each of them
+# =============================================================================
+def govuk_total_results(links):
+    with ThreadPoolExecutor(max_workers=min(len(links), HARVEST_WORKERS)) as pool:
+        return sum(pool.map(govuk_result_count, links))
+
+# =============================================================================
+# Returns the results found on the page of a search link of either backend,
+# along with whether they still need their document pages to be enriched.
+# Search API results already have their authors, so they are only enriched
+# for their first published date if API_FIRST_PUBLISHED is set
+# =============================================================================
+def govuk_page_results(df, link):
+    if is_api_link(link):
+        return get_list_govuk_api(df, get_api_page(link)), API_FIRST_PUBLISHED
+    try:
+        return search_results_from_html(search_page_text(link)), True
+    except AttributeError:
+        return [], False
+
+# =============================================================================
+# Returns the number of results on each page of a search link
+# =============================================================================
+GOVUK_PAGE_SIZE = 20
+
+def results_per_page(link):
+    if is_api_link(link):
+        return int(re.search(r'[?&]count=(\d+)', link).group(1))
+    return GOVUK_PAGE_SIZE
+
+# =============================================================================
+# Returns the link to the given page number (starting at 1) of a search link
+# of either backend
+# =============================================================================
+def govuk_page_link(link, index):
+    if is_api_link(link):
+        count = int(re.search(r'[?&]count=(\d+)', link).group(1))
+        return re.sub(r'([?&]start=)\d+', lambda m: m.group(1)+str((index-1)*count), link)
+    return re.sub(r'([?&]page=)\d+', lambda m: m.group(1)+str(index), link)
+
+# =============================================================================
+# Splits words that have run together where the lines of an organisation logo
+# were joined, e.g. "Department forEducation"
+# =============================================================================
+RUN_TOGETHER_WORDS = re.compile(r'(?<=[a-z])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])')
+
+# =============================================================================
+# Returns a title with run together words split, in lower case and with
+# single spaces, so that names written differently can be matched
+# =============================================================================
+def normal_title(name):
+    return " ".join(RUN_TOGETHER_WORDS.sub(" ", name).split()).lower()
+
+# =============================================================================
+# Where gov.uk pages name their authors. The organisation logos are used if
+# any of them are known departments, otherwise the names inside the first
+# container found, in this order
+# =============================================================================
+AUTHOR_LOGOS = soupsieve.compile("li.organisation-logos__logo")
+AUTHOR_SELECTORS = [(soupsieve.compile(container), soupsieve.compile(item)) for container, item in [
+    ("dd.gem-c-metadata__definition", "a.govuk-link"),
+    ("div.organisations-list", "a.govuk-link"),
+    ("div.gem-c-organisation-logo.brand--executive-office", "span.gem-c-organisation-logo__name"),
+    (r"div.govuk-\!-width-one-half.govuk-\!-margin-top-3.responsive-bottom-margin", "span.gem-c-organisation-logo__name"),
+    ("div.gem-c-organisation-logo.brand--attorney-generals-office", "span.gem-c-organisation-logo__name"),
+]]
+AUTHORS_ONLY = SoupStrainer(attrs={"class": class_pattern("organisation-logos__logo", "gem-c-metadata__definition",
+                                                          "organisations-list", "gem-c-organisation-logo",
+                                                          "responsive-bottom-margin")})
+
+# =============================================================================
+# Finds the departments, agencies and public bodies named as the authors of
+# gov.uk pages. Names are looked up by their exact title, by normal_title and
+# by the slug at the end of the link to their gov.uk page
+# =============================================================================
+class AuthorResolver:
+    def __init__(self, df):
+        self.exact = {}
+        self.normal = {}
+        self.slugs = {}
+        self.links = {}
+        for elem in df:
+            title = elem['Title'].strip()
+            self.exact.setdefault(title, title)
+            self.normal.setdefault(normal_title(title), title)
+            self.links.setdefault(elem['Link'], title)
+            self.slugs.setdefault(elem['Link'].rstrip("/").split("/")[-1], title)
+
+    # Returns the title of a named organisation, or None if it is not known
+    def resolve(self, name, link=None):
+        name = name.strip()
+        title = self.exact.get(name) or self.normal.get(normal_title(name))
+        if title==None and link:
+            title = self.slugs.get(link.rstrip("/").split("/")[-1])
+        return title
+
+    # Returns the title of the organisation whose gov.uk page is at the link,
+    # or None if it is not one
+    def page_title(self, link):
+        return self.links.get(link)
+
+    # Returns the authors named on an already parsed gov.uk page, which only
+    # needs the parts of the page kept by AUTHORS_ONLY
+    def authors_from_page(self, data):
+        deps = []
+        for logo in AUTHOR_LOGOS.select(data):
+            link = logo.find("a")
+            title = self.resolve(logo.text, link.get('href') if link!=None else None)
+            if title!=None:
+                deps.append(title)
+        if len(deps)>0:
+            return deps
+        for container, item in AUTHOR_SELECTORS:
+            parent = container.select_one(data)
+            if parent!=None:
+                return [self.resolve(elem.text, elem.get('href')) or elem.text.strip() for elem in item.select(parent)]
+        return deps
+
+# =============================================================================
+# Returns the authors of the literature from an already parsed gov.uk page
+# =============================================================================
+def author_deps_from_page(data):
+  return author_resolver.authors_from_page(data)
+
+# =============================================================================
+# Returns the literature listed in the html data given, without the authors
+# and first published dates that are found on the document pages
+# =============================================================================
+def parse_list_govuk(data):
   result = []
-  parent = data.find("body").find("div", {"class": "finder-results js-finder-results"})
-  text = list(parent.descendants)[1]
-  for i in text.find_all("li", {"class": "gem-c-document-list__item"}):
+  parent = data.find("div", {"class": "finder-results"})
+  for i in parent.find_all("li", {"class": "gem-c-document-list__item"}):
     title = i.find("a",{"class": "govuk-link"}).text.strip()
     title_link = i.find("a",{"class": "govuk-link"})['href']
     try:
@@ -300,407 +1897,1729 @@ def get_list_govuk(df, data):
     except:
       desc = 'None'
     updated = i.find("ul", {"class": "gem-c-document-list__item-metadata"}).text.strip()[9:]
-    authors = get_author_deps(f"https://www.gov.uk{title_link}")
-    if len(authors)==0:
-      authors = "N/A"
-      for elem in df:
-          if elem['Link']==f"https://www.gov.uk{title_link}":
-              authors = elem['Title']
-              break
     result.append({
         "Title": title,
         "URL": f"https://www.gov.uk{title_link}",
-        "Departments, Agencies, and Public bodies": authors,
+        "Departments, Agencies, and Public bodies": "N/A",
         "Abstract": desc,
         "Last Updated": updated,
-        "Date Published": get_og_gov_date(f"https://www.gov.uk{title_link}"),
+        "Date Published": "N/A",
     })
   return result
 
+# =============================================================================
+# Returns the literature listed on a gov.uk search page, parsing only the list
+# of results
+# =============================================================================
+def search_results_from_html(html):
+  data = parse_html(html, SEARCH_RESULTS_ONLY)
+  try:
+    return parse_list_govuk(data)
+  finally:
+    data.decompose()
+
+# =============================================================================
+# Returns the authors and first published date of a gov.uk document page,
+# parsing only the parts of the page that name the authors
+# =============================================================================
+def document_info_from_html(html):
+  data = parse_html(html, AUTHORS_ONLY)
+  try:
+    authors = author_deps_from_page(data)
+  except AttributeError:
+    authors = []
+  data.decompose()
+  return authors, first_published_date(html)
+
+# =============================================================================
+# Times how long gov.uk pages (saved html files or links) take to be read, and
+# the most memory used while reading them, when the whole page is parsed with
+# html.parser (before) and when only the parts needed are parsed (after).
+# Run with 'python main_project.py --benchmark-parsing <file or link> ...'
+# =============================================================================
+def benchmark_parsing(pages, rounds=20):
+    def measure(read):
+        start = time.perf_counter()
+        for i in range(rounds):
+            read()
+        taken = (time.perf_counter()-start)/rounds*1000
+        tracemalloc.start()
+        read()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return round(taken, 2), round(peak/1024)
+
+    def full_search_page(html):
+        return parse_list_govuk(BeautifulSoup(html, 'html.parser'))
+
+    def full_document_page(html):
+        data = BeautifulSoup(html, 'html.parser')
+        return author_deps_from_page(data), data.find('meta', {'name': 'govuk:first-published-at'})
+
+    rows = []
+    for page in pages:
+        try:
+            if page.startswith('http'):
+                html = fetch(page, use_cache=False).text
+            else:
+                with open(page, encoding='utf-8') as f:
+                    html = f.read()
+        except (OSError, FetchError) as e:
+            print(f"Could not read {page}: {e}")
+            continue
+        if 'finder-results' in html:
+            kind, before, after = "Search page", full_search_page, search_results_from_html
+        else:
+            kind, before, after = "Document page", full_document_page, document_info_from_html
+        before_ms, before_kb = measure(lambda: before(html))
+        after_ms, after_kb = measure(lambda: after(html))
+        rows.append([page, kind, round(len(html)/1024), before_ms, after_ms, before_kb, after_kb])
+    print(f"Parser: {HTML_PARSER}, average of {rounds} rounds")
+    print(tabulate.tabulate(rows, ["Page", "Kind", "Size (KB)", "Before (ms)", "After (ms)",
+                                   "Before peak (KB)", "After peak (KB)"]))
+    return 0 if len(rows)>0 else 1
+
+# =============================================================================
+# Fetches a gov.uk document page once and returns both its authors and the
+# date it was first published
+# =============================================================================
+def get_document_info(link):
+    try:
+        html = fetch(link).text
+    except FetchError as err:
+        log_fetch_error(err)
+        return [], "N/A"
+    return document_info_from_html(html)
+
+# =============================================================================
+# Fills in the first published date of a result, and its authors if it does
+# not have them yet, from the info read from its document page
+# =============================================================================
+def fill_document_info(elem, info):
+    authors, date = info
+    if elem["Departments, Agencies, and Public bodies"]=="N/A":
+        if len(authors)==0:
+            authors = author_resolver.page_title(elem['URL']) or "N/A"
+        elem["Departments, Agencies, and Public bodies"] = authors
+    elem["Date Published"] = date
+    return elem
+
+
+# =============================================================================
+# Retrieves total number of results
+# =============================================================================
+def get_total_results(links, selected_blogs=None, job=None):
+    try:
+        no_results = govuk_total_results(links)
+    except FetchError as err:
+        log_fetch_error(err)
+        return None, None
+    except (AttributeError, IndexError, KeyError, ValueError):
+        return None, None
+    if no_results==0:
+        return None, None
+    found_blogs = None
+    if selected_blogs!=None:
+        found_blogs = []
+        for elem in selected_blogs:
+            if job!=None:
+                job.check()
+            blog, link = elem
+            if blog.manual_count:
+                number = find_blog_number(elem, job)
+            else:
+                try:
+                    number = blog.count_from_html(fetch(link).text)
+                except FetchError as err:
+                    log_fetch_error(err)
+                    number = 0
+                except (AttributeError, IndexError, ValueError):
+                    print(f"Could not read the number of results of {blog.title}")
+                    number = 0
+            if number>0:
+                found_blogs.append(elem)
+            no_results += number
+            if job!=None:
+                job.advance('Blogs counted')
+    return no_results, found_blogs
+
+# =============================================================================
+# Creates the search links for the parameters given and counts the results.
+# Returns the links, the total number of results (None if there are none) and
+# the blogs that have results
+# =============================================================================
+def count_search(df, search_terms, sdate=None, edate=None, sort_by=None, selected_blogs=None, job=None):
+    links = govuk_search_links(df, search_terms, sdate, edate, sort_by)
+    blogs = None
+    if selected_blogs:
+        blogs = add_blog_links(selected_blogs, search_terms, sdate, edate, sort_by)
+    if job!=None:
+        job.check()
+    total_results, blogs = get_total_results(links, blogs, job)
+    return links, total_results, blogs
+
+# =============================================================================
+# Keeps the results of a search free of duplicates as they arrive. Each result
+# is admitted once, keyed on its canonical URL, and the number of results
+# admitted and rejected is counted for every source. Results at the URLs in
+# 'known' (found before) are never admitted
+# =============================================================================
+class ResultDeduper:
+    def __init__(self, known=None):
+        self.known = {canonical_url(url) for url in known or []}
+        self.seen = set(self.known)
+        self.results = []
+        self.admitted = {}
+        self.duplicates = {}
+
+    def __len__(self):
+        return len(self.results)
+
+    # Returns the results from a list that have not been seen before (at most
+    # limit of them) without adding them, counting the duplicates skipped
+    def unseen(self, results, source, limit=None):
+        new = []
+        keys = set()
+        for result in results:
+            key = canonical_url(result['URL'])
+            if key in self.seen or key in keys:
+                self.duplicates[source] = self.duplicates.get(source, 0) + 1
+            elif limit==None or len(new)<limit:
+                keys.add(key)
+                new.append(result)
+        return new
+
+    # Adds the result if it has not been seen before, returns True if it was added
+    def admit(self, result, source):
+        key = canonical_url(result['URL'])
+        if key in self.seen:
+            self.duplicates[source] = self.duplicates.get(source, 0) + 1
+            return False
+        self.seen.add(key)
+        self.results.append(result)
+        self.admitted[source] = self.admitted.get(source, 0) + 1
+        return True
+
+    # Adds every new result from a list, returns the ones that were added
+    def admit_all(self, results, source):
+        return [result for result in results if self.admit(result, source)]
+
+    # Returns True if any of the results were among the known URLs
+    def any_known(self, results):
+        return any(canonical_url(result['URL']) in self.known for result in results)
+
+    def stats(self):
+        return {'Admitted': dict(self.admitted), 'Duplicates': dict(self.duplicates)}
+
+
+# =============================================================================
+# Settings for gathering results. PAGE_PREFETCH gov.uk result pages are
+# fetched ahead of the one being enriched, HARVEST_WORKERS pages (result and
+# document pages) are fetched at the same time across all sources, and pages
+# from the same blog website are requested at least BLOG_PAGE_INTERVAL
+# seconds apart
+# =============================================================================
+PAGE_PREFETCH = 3
+HARVEST_WORKERS = 8
+BLOG_PAGE_INTERVAL = 0.5
+
+# =============================================================================
+# The pages of one gov.uk search link that a Harvester has read and asked for.
+# Results read from it wait in 'buffer', in the order gov.uk gave them, until
+# they are merged with the other shards of the search
+# =============================================================================
+class GovukShard:
+    def __init__(self, link, last_page):
+        self.link = link
+        self.last_page = last_page
+        self.pages = {}
+        self.next = 1
+        self.scheduled = 0
+        self.done = False
+        self.buffer = deque()
+        self.read = 0
+
+# =============================================================================
+# Gathers results from gov.uk and every blog at the same time. Each source
+# keeps its own place in its pages and its results are merged in as soon as
+# they arrive, so a slow website does not hold back the others. A blog stops
+# being read once a page has nothing new on it, and gov.uk once a page is
+# empty or no more results are needed. Blog results outside the date range
+# (sdate and edate, DD/MM/YYYY) are dropped, and a blog listed newest first
+# (sort_by) stops once its results are older than sdate. 'link' is a gov.uk
+# search link or a list of them (see govuk_search_links), whose results are
+# merged in the order set by sort_by. If stop_at_known is True, each source
+# also stops after the first page with a result known to the deduper, and
+# gov.uk pages are fetched 'prefetch' pages ahead
+# =============================================================================
+class Harvester:
+    def __init__(self, df, link, max_results, blogs=None, deduper=None, job=None, sdate=None, edate=None, sort_by=None,
+                 stop_at_known=False, prefetch=PAGE_PREFETCH):
+        self.df = df
+        self.links = [link] if isinstance(link, str) else list(link)
+        self.max_results = max_results
+        self.blogs = blogs or []
+        self.deduper = deduper if deduper!=None else ResultDeduper()
+        self.job = job
+        self.sdate = sdate
+        self.edate = edate
+        self.sort_by = sort_by
+        self.stop_at_known = stop_at_known
+        self.prefetch = prefetch
+        self.limiter = HostLimiter(per_host=1, interval=BLOG_PAGE_INTERVAL)
+        self.pool = ThreadPoolExecutor(max_workers=HARVEST_WORKERS)
+        self.tasks = {}
+        # Pages needed from a shard if every result is unique and comes from
+        # it. Later pages are only requested if the results are still short
+        last_page = max(1, math.ceil(max_results/results_per_page(self.links[0])))
+        self.shards = [GovukShard(link, last_page) for link in self.links]
+        self.needs_enriching = False
+        self.enriching = 0
+        self.pages = 0
+        self.yielded = 0
+        # Pages of each source ('gov.uk' or a blog title) that could not be read
+        self.failures = {}
+
+    # Yields each batch of new results as it is found. How many duplicates
+    # were removed from each source is kept in deduper.stats()
+    def run(self):
+        self._schedule_govuk()
+        for blog, link in self.blogs:
+            self._schedule_blog(blog, link, set())
+        try:
+            while len(self.tasks)>0 and self.yielded<self.max_results:
+                if self.job!=None:
+                    self.job.check()
+                done, pending = wait(list(self.tasks), timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, value = self.tasks.pop(future)
+                    if kind=='blog':
+                        batch = self._blog_page(future, value)
+                    elif kind=='document':
+                        batch = self._document_read(future, value)
+                    else:
+                        batch = self._govuk_pages()
+                    batch = batch[:self.max_results-self.yielded]
+                    if len(batch)>0:
+                        self.yielded += len(batch)
+                        yield batch
+                    if self.yielded>=self.max_results:
+                        break
+                if self.job!=None:
+                    self.job.progress(Pages=self.pages, Results=self.yielded, Target=self.max_results,
+                                      Duplicates=sum(self.deduper.duplicates.values()))
+        finally:
+            # Any pages that are no longer needed are not requested
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    # Returns how many more results are wanted from gov.uk
+    def _govuk_wanted(self):
+        return self.max_results - len(self.deduper) - self.enriching
+
+    def _schedule_govuk(self):
+        for shard in self.shards:
+            if shard.next<=shard.last_page:
+                ahead = shard.next+self.prefetch
+            elif len(shard.buffer)==0:
+                # The merge is waiting on this shard
+                ahead = shard.next+1
+            else:
+                continue
+            while not shard.done and self._govuk_wanted()>0 and shard.scheduled<min(max(shard.last_page, shard.next), ahead):
+                shard.scheduled += 1
+                future = self.pool.submit(govuk_page_results, self.df, govuk_page_link(shard.link, shard.scheduled))
+                shard.pages[shard.scheduled] = future
+                self.tasks[future] = ('gov.uk', shard)
+
+    # Returns what a gov.uk result is merged by. Relevance scores cannot be
+    # compared between searches, so the shards take turns by rank then
+    def _merge_key(self, result, rank):
+        if self.sort_by in ("Newest First", "Oldest First"):
+            date = sortable_date(result['Last Updated'])
+            if self.sort_by=="Newest First":
+                date = tuple(-part for part in date)
+            return (date, rank)
+        return (rank,)
+
+    # Takes the results of every shard out of their buffers in order, for as
+    # long as every shard that is not finished has a result waiting
+    def _merge_shards(self, limit):
+        merged = []
+        while len(merged)<limit:
+            heads = [shard for shard in self.shards if len(shard.buffer)>0 or not shard.done]
+            if len(heads)==0 or any(len(shard.buffer)==0 for shard in heads):
+                break
+            shard = min(heads, key=lambda shard: shard.buffer[0][0])
+            merged.append(shard.buffer.popleft()[1])
+        return merged
+
+    # Reads the gov.uk pages that have arrived, in order for each shard, and
+    # returns the merged results that are ready. Results that need their
+    # document pages fetched are enriched in the background and returned once
+    # that has finished
+    def _govuk_pages(self):
+        batch = []
+        for shard in self.shards:
+            while shard.next in shard.pages and shard.pages[shard.next].done():
+                future = shard.pages.pop(shard.next)
+                shard.next += 1
+                if shard.done:
+                    continue
+                try:
+                    page, self.needs_enriching = future.result()
+                except FetchError as err:
+                    log_fetch_error(err)
+                    self._failed('gov.uk')
+                    shard.done = True
+                    continue
+                except ValueError:
+                    self._failed('gov.uk')
+                    shard.done = True
+                    continue
+                self.pages += 1
+                if len(page)==0:
+                    shard.done = True
+                    continue
+                for result in page:
+                    shard.buffer.append((self._merge_key(result, shard.read), result))
+                    shard.read += 1
+                if self.stop_at_known and self.deduper.any_known(page):
+                    shard.done = True
+        wanted = self._govuk_wanted()
+        # Only results that are new and still needed have their document pages fetched
+        new = self.deduper.unseen(self._merge_shards(max(0, wanted)), 'gov.uk', max(0, wanted))
+        if self.needs_enriching and len(new)>0:
+            self.enriching += len(new)
+            waiting = {'Results': new, 'Left': len(new)}
+            for elem in new:
+                self.tasks[self.pool.submit(self._document_info, elem['URL'])] = ('document', (waiting, elem))
+        else:
+            batch += self.deduper.admit_all(new, 'gov.uk')
+        self._schedule_govuk()
+        return batch
+
+    def _document_info(self, link):
+        if self.job!=None:
+            self.job.check()
+        info = get_document_info(link)
+        if self.job!=None:
+            self.job.advance('Enriched')
+        return info
+
+    # Fills in a result from its document page. Once every result from the
+    # same gov.uk pages has been filled in, they are added together in order
+    def _document_read(self, future, source):
+        waiting, elem = source
+        self.enriching -= 1
+        fill_document_info(elem, future.result())
+        waiting['Left'] -= 1
+        if waiting['Left']>0:
+            return []
+        return self.deduper.admit_all(waiting['Results'], 'gov.uk') + self._govuk_pages()
+
+    def _failed(self, source):
+        self.failures[source] = self.failures.get(source, 0) + 1
+
+    def _schedule_blog(self, blog, link, previous):
+        if link!=None:
+            self.tasks[self.pool.submit(read_blog_page, link, blog, self.limiter)] = ('blog', (blog, link, previous))
+
+    # Adds the results of a blog page and asks for the blog's next page if
+    # this one had anything new on it, or only had results outside the date
+    # range that later pages may be within
+    def _blog_page(self, future, source):
+        blog, link, previous = source
+        try:
+            results = future.result()
+        except FetchError as err:
+            log_fetch_error(err)
+            self._failed(blog.title)
+            return []
+        self.pages += 1
+        kept, past_start = blog.in_date_range(results, self.sdate, self.edate, self.sort_by)
+        batch = self.deduper.admit_all(kept, blog.title)
+        urls = {elem['URL'] for elem in results}
+        reached_known = self.stop_at_known and self.deduper.any_known(results)
+        if (len(batch)>0 or len(kept)<len(results)) and not past_start and not reached_known and urls!=previous:
+            self._schedule_blog(blog, blog.next_page(link), urls)
+        return batch
+
+# =============================================================================
+# One search and what it has found. A session owns its parameters, the search
+# links and blogs found when it is counted, the Harvester holding its place in
+# every source and its results, so that several sessions can run at the same
+# time on different threads. Sessions share the connection pool, the page
+# cache and the blog counts. 'organisations' are department records and
+# 'blogs' the BlogSpecs of any of them that have a blog
+# =============================================================================
+class SearchSession:
+    def __init__(self, organisations, keywords, sdate=None, edate=None, sort_by=None, blogs=None):
+        self.organisations = list(organisations)
+        self.keywords = keywords
+        self.sdate = sdate
+        self.edate = edate
+        self.sort_by = sort_by if sort_by in SEARCH_ORDERS else SEARCH_ORDERS[0]
+        self.selected_blogs = list(blogs or [])
+        # Found when the session is counted
+        self.links = None
+        self.total = None
+        self.blogs = []
+        # Found when the session is searched
+        self.harvester = None
+        self.results = []
+
+    # Returns the titles of the organisations searched
+    def departments(self):
+        return [record['Title'].strip() for record in self.organisations]
+
+    # Creates the search links and counts the results. Returns the session
+    def count(self, job=None):
+        self.links, self.total, self.blogs = count_search(self.organisations, self.keywords, self.sdate, self.edate,
+                                                          self.sort_by, self.selected_blogs, job)
+        return self
+
+    # Creates the search links without counting the results, so every blog
+    # is searched. Returns the session
+    def plan(self):
+        self.links = govuk_search_links(self.organisations, self.keywords, self.sdate, self.edate, self.sort_by)
+        self.blogs = add_blog_links(self.selected_blogs, self.keywords, self.sdate, self.edate, self.sort_by)
+        return self
+
+    # Yields the results in batches as they are found until max_results have
+    # been found or there are no more. Each search starts from the beginning.
+    # If 'known' URLs are given, only other results are found, one page at a
+    # time, and if stop_at_known is True each source stops once it reaches a
+    # known one
+    def search(self, max_results, job=None, known=None, stop_at_known=True):
+        self.results = []
+        if self.links==None:
+            self.count(job)
+            if self.total==None:
+                return
+        if known==None:
+            self.harvester = Harvester(full_df, self.links, max_results, self.blogs, None, job,
+                                       self.sdate, self.edate, self.sort_by)
+        else:
+            self.harvester = Harvester(full_df, self.links, max_results, self.blogs, ResultDeduper(known), job,
+                                       self.sdate, self.edate, self.sort_by, stop_at_known=stop_at_known, prefetch=0)
+        for batch in self.harvester.run():
+            self.results += batch
+            yield batch
+
+    # Searches for max_results results (see search) and returns them
+    def run(self, max_results, job=None, known=None, stop_at_known=True):
+        for batch in self.search(max_results, job, known, stop_at_known):
+            pass
+        return self.results
+
+    # Searches for max_results results, posting each batch to the job as it
+    # is found. Returns how many were found
+    def stream(self, max_results, job=None):
+        for batch in self.search(max_results, job):
+            if job!=None:
+                job.post('results', batch)
+        return len(self.results)
+
+# =============================================================================
+# Prints the gathered results and the departments and search terms that the 
+# results were based on
+# =============================================================================
+def print_results(result, refined, search_terms):
+    print(f"Here is the {len(result)} result(s) when searching \"{search_terms}\"")
+    header = result[0].keys()
+    rows = [value.values() for value in result]
+    print(tabulate.tabulate(rows, header))
+
+titles = catalogue['titles']
+author_resolver = AuthorResolver(catalogue['full_df'])
+
+# =============================================================================
+# Creates the URL for a blog given its BlogSpec, search terms, and other
+# parameters. The URL is built locally, encoded the same way requests
+# encodes the query parameters it sends, so no request is made
+# =============================================================================
+def create_blog_link(blog, search_terms, sdate=None, edate=None, sort_by=None):
+  link = blog.link+blog.search
+  params = blog.search_params(search_terms, sdate, edate, sort_by)
+  try:
+    return requests.Request('GET', link, params=params).prepare().url
+  except requests.RequestException as e:
+    print(f"Could not build the search link for {blog.title}: {e}")
+    return None
+
+# =============================================================================
+# Returns list of lists containing a unique blog information dictionary and 
+# its corresponding URL
+# =============================================================================
+def add_blog_links(blogs, search_terms, sdate=None, edate=None, sort_by=None):
+  links = []
+  for blog in blogs:
+    URL = create_blog_link(blog, search_terms, sdate, edate, sort_by)
+    if URL!=None and [blog, URL] not in links:
+        links.append([blog, URL])
+  return links
+
+
+# =============================================================================
+# Returns number of results from a select URL
+# =============================================================================
+def get_manual_number(link, blog):
+  try:
+    html = fetch(link).text
+  except FetchError as err:
+    log_fetch_error(err)
+    return None
+  soup = parse_html(html, blog.results_only())
+  i = blog.results_element(soup)
+  if i==None:
+    soup.decompose()
+    return None
+  links = set()
+  for j in i.find_all(blog.link_tag):
+    href = j.get('href')
+    if href and not blog.is_search_link(href):
+      links.add(href)
+  soup.decompose()
+  return len(links)
+
+# =============================================================================
+# If the page number is inside the URL, this function increments the page number
+# by the correct increment number and returns the updated URL
+# =============================================================================
+def next_page_inner(link, snippet, increment):
+  try:
+    ind = link.index(snippet)
+    first_half = link[:ind]
+    sect = link[ind+len(snippet):]
+    counter = 1
+    number = 0
+    while True:
+      try:
+        number = int(sect[:counter])
+        counter += 1
+      except:
+        counter -= 1
+        break
+    number = number + increment
+    result = first_half + snippet + str(number) + sect[counter:]
+    return result
+  except:
+    return None
+
+# =============================================================================
+# Settings for counting the results of blogs that do not show a total. Counts
+# are kept for BLOG_COUNT_TTL seconds, at most BLOG_COUNT_MAX_PAGES pages are
+# looked at, and GREY_REVIEW_BLOG_COUNT=estimate counts only the first page
+# (a lower bound) unless a full count is already known
+# =============================================================================
+BLOG_COUNT_TTL = 10 * 60
+BLOG_COUNT_MAX_PAGES = 1024
+BLOG_COUNT_MODE = os.environ.get('GREY_REVIEW_BLOG_COUNT', 'exact')
+blog_counts = {}
+blog_counts_lock = threading.Lock()
+
+# =============================================================================
+# Given a blog and the link to the first page of its search, returns the
+# number of results when 'get_total_results' calls it. The last page with
+# results is found by doubling the page number until a page is empty and
+# then halving the gap, so only about 2*log2(pages) pages are fetched. Every
+# page before the last is taken to hold as many results as the first
+# =============================================================================
+def find_blog_number(elem, job=None, estimate=None):
+    blog = elem[0]
+    link = elem[1]
+    if estimate==None:
+      estimate = BLOG_COUNT_MODE=='estimate'
+    key = (blog.title, link)
+    with blog_counts_lock:
+      cached = blog_counts.get(key)
+    if cached!=None and time.time()-cached[0]<BLOG_COUNT_TTL:
+      return cached[1]
+
+    def page_count(pages):
+      if job!=None:
+        job.check()
+      page = blog.page_link(link, pages)
+      if page==None:
+        return 0
+      return get_manual_number(page, blog) or 0
+
+    first = page_count(0)
+    if first==0 or estimate:
+      return first
+    # lo is the last page known to have results, hi the first known not to.
+    # If the last page looked at (BLOG_COUNT_MAX_PAGES-1) has results, hi is
+    # None and the count stops there
+    lo, hi = 0, None
+    last = first
+    probe = 1
+    while probe<BLOG_COUNT_MAX_PAGES:
+      found = page_count(probe)
+      if found==0:
+        hi = probe
+        break
+      lo, last = probe, found
+      probe = BLOG_COUNT_MAX_PAGES if probe==BLOG_COUNT_MAX_PAGES-1 else min(probe*2, BLOG_COUNT_MAX_PAGES-1)
+    while hi!=None and hi-lo>1:
+      mid = (lo+hi)//2
+      found = page_count(mid)
+      if found>0:
+        lo, last = mid, found
+      else:
+        hi = mid
+    number = lo*first + last
+    with blog_counts_lock:
+      blog_counts[key] = (time.time(), number)
+    return number
+
+# =============================================================================
+# Given a link and the corresponding information regarding how to retrieve the information,
+#  the tool returns all possible information. Raises FetchError if the page
+#  cannot be retrieved
+# =============================================================================
+def read_blog_page(link, blog, limiter=None):
+    results = []
+    html = (limiter.fetch(link) if limiter!=None else fetch(link)).text
+    soup = parse_html(html, blog.results_only())
+    # filter html text to find section containing results
+    i = blog.results_element(soup)
+    if i==None:
+        soup.decompose()
+        return results
+    
+    # Find any possible dates for the existing features
+    dates = []
+    if blog.date_tag!=None:
+        dates = [blog.parse_date(d.text) for d in i.find_all(blog.date_tag, {'class': blog.date_class})]
+    counter = 0
+    for j in i.find_all(blog.link_tag):
+        href = j.get('href')
+        if not href or blog.is_search_link(href):
+            continue
+        date = dates[counter] if counter<len(dates) else "N/A"
+        blog_title = j.text.strip().replace('\n', '')
+        blog_title = re.sub(' +', ' ', blog_title)
+        entry = {
+            'Title': blog_title,
+            'URL': blog.absolute(href),
+            'Departments, Agencies, and Public bodies': blog.title,
+            "Abstract": "N/A",
+            "Last Updated": "N/A",
+            'Date Published': date}
+        results.append(entry)
+        counter += 1
+    soup.decompose()
+    return results
+
+
+# =============================================================================
+# Adds a hyperlink to a paragraph in a word document
+# =============================================================================
+def add_hyperlink(paragraph, text, url):
+  # This gets access to the document.xml.rels file and gets a new relation id value
+  part = paragraph.part
+  r_id = part.relate_to(url, docx.opc.constants.RELATIONSHIP_TYPE.HYPERLINK, is_external=True)
+
+  # Create the w:hyperlink tag and add needed values
+  hyperlink = docx.oxml.shared.OxmlElement('w:hyperlink')
+  hyperlink.set(docx.oxml.shared.qn('r:id'), r_id, )
+
+  # Create a new run object (a wrapper over a 'w:r' element)
+  new_run = docx.text.run.Run(docx.oxml.shared.OxmlElement('w:r'), paragraph)
+  new_run.text = text
+
+  # Alternatively, set the run's formatting explicitly
+  new_run.font.color.rgb = docx.shared.RGBColor(0, 0, 255)
+  new_run.font.underline = True
+
+  # Join all the xml elements together
+  hyperlink.append(new_run._element)
+  paragraph._p.append(hyperlink)
+  return hyperlink
+
+# =============================================================================
+# Writes results to an Excel file and returns how many were written
+# =============================================================================
+def write_excel(results, path='out.xlsx', job=None):
+  pd.DataFrame(results).to_excel(path, index=False)
+  return len(results)
+
+# =============================================================================
+# Writes results to a Word document as a numbered reference list and returns
+# how many were written. If last_updated is True the year each result was
+# last updated is added
+# =============================================================================
+def write_word(results, path='out.docx', last_updated=False, job=None):
+  doc = docx.Document()
+  doc.add_heading('Results exported to Word')
+  counter = 1
+  for elem in results:
+    if job!=None:
+      job.check()
+    p = doc.add_paragraph(f"{counter}. {elem['Departments, Agencies, and Public bodies']}. ")
+    add_hyperlink(p, elem['Title'], elem['URL'])
+    p.add_run(f" ({elem['Date Published'][-4:]})")
+    if last_updated:
+      p.add_run(f" (Last Updated {elem['Last Updated'][-4:]})")
+    counter += 1
+  doc.save(path)
+  return len(results)
+
+# =============================================================================
+# Settings for the saved searches. Searches saved before they were kept in
+# SAVED_SEARCHES_PATH (as a .txt and .csv file with the same name in
+# SAVED_SEARCHES_DIR) are copied into it the first time it is opened. A saved
+# search is shown SAVED_PAGE_SIZE results at a time
+# =============================================================================
+SAVED_SEARCHES_PATH = 'saved_searches.sqlite'
+SAVED_SEARCHES_DIR = 'saved_searches'
+SAVED_PAGE_SIZE = 200
+SAVED_RESULT_FIELDS = [('title', 'Title'), ('url', 'URL'), ('authors', 'Departments, Agencies, and Public bodies'),
+                       ('abstract', 'Abstract'), ('last_updated', 'Last Updated'), ('date_published', 'Date Published')]
+
+# =============================================================================
+# Returns the organisations of a result. Results read back from files have
+# them joined by ", ", and as some titles have a comma in them (e.g.
+# "Department for Environment, Food & Rural Affairs") the longest run of
+# parts that names a known organisation, by its title or by the slug of its
+# gov.uk page, is taken as one organisation
+# =============================================================================
+def known_organisation(name):
+    slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+    return author_resolver.resolve(name)!=None or slug in author_resolver.slugs
+
+def split_authors(authors):
+    if isinstance(authors, list):
+        return [name for name in authors if name]
+    if not authors or authors=="N/A":
+        return []
+    parts = authors.split(", ")
+    names = []
+    i = 0
+    while i<len(parts):
+        j = len(parts)
+        while j>i+1 and not known_organisation(", ".join(parts[i:j])):
+            j -= 1
+        names.append(", ".join(parts[i:j]))
+        i = j
+    return names
+
+# =============================================================================
+# Keeps saved searches in a SQLite database. The parameters of each search
+# are kept as columns of 'searches', so they can be listed without reading
+# any results, and the results as rows of 'results' in the order they were
+# found, indexed by URL and date published. Each organisation of a result is
+# a row of 'result_authors', indexed by organisation. Safe to use from
+# several threads at once
+# =============================================================================
+class SavedSearchStore:
+    def __init__(self, path=SAVED_SEARCHES_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS searches (
+                                 id INTEGER PRIMARY KEY, name TEXT UNIQUE, saved TEXT,
+                                 sources TEXT, keywords TEXT, start_date TEXT, end_date TEXT,
+                                 sort_by TEXT, result_count INTEGER)""")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS results (
+                                 search_id INTEGER REFERENCES searches (id) ON DELETE CASCADE,
+                                 position INTEGER, title TEXT, url TEXT, authors TEXT,
+                                 abstract TEXT, last_updated TEXT, date_published TEXT, published TEXT,
+                                 run_id INTEGER,
+                                 PRIMARY KEY (search_id, position))""")
+        new_authors = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name='result_authors'").fetchone()==None
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS result_authors (
+                                 search_id INTEGER, position INTEGER, organisation TEXT,
+                                 PRIMARY KEY (search_id, position, organisation),
+                                 FOREIGN KEY (search_id, position) REFERENCES results (search_id, position) ON DELETE CASCADE)""")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS runs (
+                                 id INTEGER PRIMARY KEY,
+                                 search_id INTEGER REFERENCES searches (id) ON DELETE CASCADE,
+                                 started TEXT, finished TEXT, added INTEGER, pages INTEGER,
+                                 complete INTEGER DEFAULT 1)""")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS watches (
+                                 search_id INTEGER PRIMARY KEY REFERENCES searches (id) ON DELETE CASCADE,
+                                 interval_days REAL, next_run TEXT, last_run TEXT,
+                                 failures INTEGER DEFAULT 0, last_error TEXT)""")
+        # Stores made before searches could be refreshed have no run_id
+        if 'run_id' not in [row[1] for row in self.conn.execute("PRAGMA table_info(results)")]:
+            self.conn.execute("ALTER TABLE results ADD COLUMN run_id INTEGER")
+        # Stores made before refreshes could stop at REFRESH_MAX_NEW have runs that all finished
+        if 'complete' not in [row[1] for row in self.conn.execute("PRAGMA table_info(runs)")]:
+            self.conn.execute("ALTER TABLE runs ADD COLUMN complete INTEGER DEFAULT 1")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_url ON results (url)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_run ON results (run_id)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS runs_search ON runs (search_id)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS watches_next ON watches (next_run)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_published ON results (published)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS result_authors_organisation ON result_authors (organisation)")
+        # Stores made before organisations had their own table are filled in
+        self.conn.execute("DROP INDEX IF EXISTS results_authors")
+        if new_authors:
+            rows = self.conn.execute("SELECT search_id, position, authors FROM results").fetchall()
+            self.conn.executemany("INSERT OR IGNORE INTO result_authors VALUES (?, ?, ?)",
+                                  [(search_id, position, name) for search_id, position, authors in rows
+                                   for name in split_authors(authors)])
+        self.conn.commit()
+
+    # Stores results, numbered from 'start', along with their organisations.
+    # The caller holds the lock and commits
+    def _insert_results(self, search_id, results, start=0, run_id=None):
+        rows = []
+        authors = []
+        for position, elem in enumerate(results, start):
+            values = [elem.get(key) for column, key in SAVED_RESULT_FIELDS]
+            names = split_authors(values[2])
+            if isinstance(values[2], list):
+                values[2] = ", ".join(values[2])
+            date = sortable_date(elem.get('Date Published'))
+            published = "%04d-%02d-%02d" % date if date!=(0, 0, 0) else None
+            rows.append((search_id, position, *values, published, run_id))
+            authors += [(search_id, position, name) for name in set(names)]
+        self.conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.executemany("INSERT INTO result_authors VALUES (?, ?, ?)", authors)
+
+    # Saves a search and its results, returning its id. 'sources' are the
+    # titles of the organisations searched. Raises ValueError if a search
+    # with the same name has already been saved
+    def save(self, name, results, sources, keywords, sdate=None, edate=None, sort_by=None, saved=None):
+        if saved==None:
+            saved = datetime.now().isoformat(timespec='seconds')
+        with self.lock:
+            try:
+                cursor = self.conn.execute("INSERT INTO searches (name, saved, sources, keywords, start_date, end_date, sort_by, result_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                           (name, saved, json.dumps(list(sources)), keywords, sdate, edate, sort_by, len(results)))
+            except sqlite3.IntegrityError:
+                raise ValueError(f"A search called '{name}' has already been saved")
+            search_id = cursor.lastrowid
+            self._insert_results(search_id, results)
+            self.conn.commit()
+        return search_id
+
+    # Returns the parameters of every saved search, newest first, without
+    # reading their results
+    def searches(self):
+        with self.lock:
+            rows = self.conn.execute(f"SELECT {self.SEARCH_COLUMNS} FROM searches ORDER BY saved DESC, id DESC").fetchall()
+        return [self._search(row) for row in rows]
+
+    SEARCH_COLUMNS = "id, name, saved, sources, keywords, start_date, end_date, sort_by, result_count"
+
+    def _search(self, row):
+        return {'Id': row[0], 'Name': row[1], 'Saved': row[2], 'Sources': json.loads(row[3]), 'Keywords': row[4],
+                'Start date': row[5], 'End date': row[6], 'Sort by': row[7], 'Results': row[8]}
+
+    # Returns the parameters of one saved search, or None if there is no such search
+    def search(self, search_id):
+        with self.lock:
+            row = self.conn.execute(f"SELECT {self.SEARCH_COLUMNS} FROM searches WHERE id=?", (search_id,)).fetchone()
+        return self._search(row) if row!=None else None
+
+    # Returns the URLs of every result of a saved search
+    def urls(self, search_id):
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT url FROM results WHERE search_id=?", (search_id,))]
+
+    # Adds the new results found by refreshing a saved search after its other
+    # results, recording the refresh as a run. A run that is not complete
+    # stopped before it had found every new result. Returns the id of the run
+    def add_run(self, search_id, results, started, pages, complete=True):
+        finished = datetime.now().isoformat(timespec='seconds')
+        with self.lock:
+            cursor = self.conn.execute("INSERT INTO runs (search_id, started, finished, added, pages, complete) VALUES (?, ?, ?, ?, ?, ?)",
+                                       (search_id, started, finished, len(results), pages, int(complete)))
+            run_id = cursor.lastrowid
+            start = self.conn.execute("SELECT COALESCE(MAX(position)+1, 0) FROM results WHERE search_id=?", (search_id,)).fetchone()[0]
+            self._insert_results(search_id, results, start, run_id)
+            self.conn.execute("UPDATE searches SET result_count=result_count+? WHERE id=?", (len(results), search_id))
+            self.conn.commit()
+        return run_id
+
+    # Returns the day (DD/MM/YYYY) a saved search was last refreshed by a
+    # complete run, or was saved if it never has been, or None if that is not
+    # known. Every result from before that day has been found
+    def last_checked(self, search_id):
+        with self.lock:
+            row = self.conn.execute("""SELECT COALESCE((SELECT MAX(finished) FROM runs WHERE search_id=? AND complete=1), saved)
+                                       FROM searches WHERE id=?""", (search_id, search_id)).fetchone()
+        try:
+            return datetime.strptime(row[0][:10], '%Y-%m-%d').strftime('%d/%m/%Y')
+        except (TypeError, ValueError):
+            return None
+
+    # Returns whether a saved search has been refreshed by a run that was not
+    # complete since its last complete one, so results older than some it
+    # already has may still be missing
+    def unfinished(self, search_id):
+        with self.lock:
+            row = self.conn.execute("""SELECT COUNT(*) FROM runs WHERE search_id=? AND complete=0
+                                       AND id>COALESCE((SELECT MAX(id) FROM runs WHERE search_id=? AND complete=1), 0)""",
+                                    (search_id, search_id)).fetchone()
+        return row[0]>0
+
+    # Returns every refresh of a saved search, newest first
+    def runs(self, search_id):
+        with self.lock:
+            rows = self.conn.execute("SELECT id, started, finished, added, pages, complete FROM runs WHERE search_id=? ORDER BY id DESC", (search_id,)).fetchall()
+        return [{'Id': row[0], 'Started': row[1], 'Finished': row[2], 'Added': row[3], 'Pages': row[4], 'Complete': row[5]==1}
+                for row in rows]
+
+    # Returns the results a refresh added
+    def run_results(self, run_id):
+        with self.lock:
+            rows = self.conn.execute("SELECT title, url, authors, abstract, last_updated, date_published FROM results WHERE run_id=? ORDER BY position",
+                                     (run_id,)).fetchall()
+        return [{key: value for (column, key), value in zip(SAVED_RESULT_FIELDS, row)} for row in rows]
+
+    # Returns up to 'count' results of a saved search, starting at 'start'
+    def results(self, search_id, start=0, count=SAVED_PAGE_SIZE):
+        with self.lock:
+            rows = self.conn.execute("SELECT title, url, authors, abstract, last_updated, date_published FROM results WHERE search_id=? AND position>=? ORDER BY position LIMIT ?",
+                                     (search_id, start, count)).fetchall()
+        return [{key: value for (column, key), value in zip(SAVED_RESULT_FIELDS, row)} for row in rows]
+
+    # Returns the results of every saved search (or only the one given) from
+    # an organisation, with the id of the search each one is from
+    def results_by(self, organisation, search_id=None):
+        query = """SELECT results.search_id, title, url, authors, abstract, last_updated, date_published
+                   FROM result_authors JOIN results USING (search_id, position)
+                   WHERE organisation=?"""
+        params = (organisation,)
+        if search_id!=None:
+            query += " AND result_authors.search_id=?"
+            params += (search_id,)
+        with self.lock:
+            rows = self.conn.execute(query+" ORDER BY results.search_id, position", params).fetchall()
+        return [{'Search': row[0], **{key: value for (column, key), value in zip(SAVED_RESULT_FIELDS, row[1:])}} for row in rows]
+
+    def delete(self, search_id):
+        with self.lock:
+            self.conn.execute("DELETE FROM searches WHERE id=?", (search_id,))
+            self.conn.commit()
+
+    # Refreshes a saved search every interval_days from first_run, replacing
+    # any earlier watch of it
+    def set_watch(self, search_id, interval_days, first_run):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO watches (search_id, interval_days, next_run, failures) VALUES (?, ?, ?, 0)",
+                              (search_id, interval_days, first_run.isoformat(timespec='seconds')))
+            self.conn.commit()
+
+    # Stops watching a saved search. Returns False if it was not watched
+    def remove_watch(self, search_id):
+        with self.lock:
+            cursor = self.conn.execute("DELETE FROM watches WHERE search_id=?", (search_id,))
+            self.conn.commit()
+        return cursor.rowcount>0
+
+    # Returns the watched searches that are due at 'now' (every watched search
+    # if now is None), the ones due first first. Paused searches have no
+    # next run and are never due
+    def watches(self, now=None):
+        query = """SELECT searches.id, searches.name, interval_days, next_run, last_run, failures, last_error
+                   FROM watches JOIN searches ON searches.id=watches.search_id"""
+        params = ()
+        if now!=None:
+            query += " WHERE next_run<=?"
+            params = (now.isoformat(timespec='seconds'),)
+        with self.lock:
+            rows = self.conn.execute(query+" ORDER BY next_run", params).fetchall()
+        return [{'Id': row[0], 'Name': row[1], 'Interval': row[2], 'Next run': row[3], 'Last run': row[4],
+                 'Failures': row[5], 'Last error': row[6]} for row in rows]
+
+    # Stops refreshing a watched search until it is watched again, recording why
+    def pause_watch(self, search_id, error):
+        with self.lock:
+            self.conn.execute("UPDATE watches SET next_run=NULL, failures=failures+1, last_error=? WHERE search_id=?",
+                              (error, search_id))
+            self.conn.commit()
+
+    # Records that a watched search was refreshed (or failed to be, with the
+    # error given) and when it is next due
+    def watch_ran(self, search_id, next_run, error=None):
+        now = datetime.now().isoformat(timespec='seconds')
+        next_run = next_run.isoformat(timespec='seconds')
+        with self.lock:
+            if error==None:
+                self.conn.execute("UPDATE watches SET next_run=?, last_run=?, failures=0, last_error=NULL WHERE search_id=?",
+                                  (next_run, now, search_id))
+            else:
+                self.conn.execute("UPDATE watches SET next_run=?, failures=failures+1, last_error=? WHERE search_id=?",
+                                  (next_run, error, search_id))
+            self.conn.commit()
+
+    # Copies the searches saved as .txt and .csv files in a directory into the
+    # store, skipping any that are already in it. Returns how many were copied
+    def import_directory(self, directory=SAVED_SEARCHES_DIR):
+        with self.lock:
+            known = {row[0] for row in self.conn.execute("SELECT name FROM searches")}
+        copied = 0
+        names = set(os.listdir(directory))
+        for name in sorted(names):
+            filename = name[:-4]
+            if name[0]=='.' or not name.endswith(".txt") or filename+".csv" not in names or filename in known:
+                continue
+            try:
+                with open(os.path.join(directory, name)) as f:
+                    params = dict(line.split(": ", 1) for line in f.read().split("\n") if ": " in line)
+                with open(os.path.join(directory, filename+".csv")) as f:
+                    results = list(csv.DictReader(f, skipinitialspace=True))
+            except (OSError, ValueError, csv.Error) as e:
+                print(f"Could not copy the saved search {filename}: {e}")
+                continue
+            dates = [None if params.get(key) in (None, 'None') else params[key] for key in ('Start date', 'End date')]
+            # The organisations were saved separated by spaces, so they are kept as one source
+            self.save(filename, results, [params.get('Sources', '')], params.get('Keywords', ''), dates[0], dates[1],
+                      params.get('Sort by'), saved=filename[:10])
+            copied += 1
+        return copied
+
+saved_store = None
+saved_store_lock = threading.Lock()
+
+# =============================================================================
+# Most new results a refresh of a saved search adds
+# =============================================================================
+REFRESH_MAX_NEW = 500
+
+# =============================================================================
+# Returns the shared saved search store, opening it (and copying in any
+# searches saved as files) the first time it is needed. Raises sqlite3.Error
+# if it cannot be opened
+# =============================================================================
+def get_saved_store():
+    global saved_store
+    with saved_store_lock:
+        if saved_store==None:
+            saved_store = SavedSearchStore(SAVED_SEARCHES_PATH)
+            if os.path.isdir(SAVED_SEARCHES_DIR):
+                copied = saved_store.import_directory(SAVED_SEARCHES_DIR)
+                if copied>0:
+                    print(f"Copied {copied} saved search(es) from '{SAVED_SEARCHES_DIR}' into '{SAVED_SEARCHES_PATH}'")
+        return saved_store
+
+# =============================================================================
+# Raised when a saved search could not be refreshed because pages of some of
+# its sources could not be read. Nothing is added to the search, so the next
+# refresh looks for the same results again
+# =============================================================================
+class RefreshError(Exception):
+    pass
+
+# =============================================================================
+# Runs a saved search again, newest first, and adds the results that were not
+# found before. Only results from the day it was last completely refreshed
+# (or saved) onwards are searched for, so each source stops once its results
+# are older than that, and also at the first page that has a result the search
+# already has. A refresh that finds REFRESH_MAX_NEW results is not complete:
+# the next one searches from the same day again, and reads past the results
+# the search already has to find the older ones that were left out. Only the
+# new gov.uk results have their document pages fetched. Returns the new
+# results. Raises ValueError if the search cannot be run again, and
+# RefreshError if a page of any source could not be read
+# =============================================================================
+def refresh_saved_search(search_id, store=None, job=None):
+    if store==None:
+        store = get_saved_store()
+    search = store.search(search_id)
+    if search==None:
+        raise ValueError(f"There is no saved search {search_id}")
+    records, blogs, unknown = select_organisations(search['Sources'])
+    if len(unknown)>0 or len(records)==0:
+        raise ValueError(f"'{search['Name']}' cannot be refreshed as its organisations are not known: {unknown}")
+    started = datetime.now().isoformat(timespec='seconds')
+    sdate = search['Start date']
+    checked = store.last_checked(search_id)
+    if checked!=None and (sdate==None or sortable_date(checked)>sortable_date(sdate)):
+        sdate = checked
+    session = SearchSession(records, search['Keywords'], sdate, search['End date'], "Newest First", blogs).plan()
+    session.run(REFRESH_MAX_NEW, job, known=store.urls(search_id), stop_at_known=not store.unfinished(search_id))
+    failures = session.harvester.failures
+    if len(failures)>0:
+        raise RefreshError("Could not read " + ", ".join(f"{count} page(s) of {source}" for source, count in failures.items()))
+    if session.harvester.pages==0:
+        raise RefreshError("No pages could be read")
+    store.add_run(search_id, session.results, started, session.harvester.pages, refresh_complete(session.results))
+    return session.results
+
+# =============================================================================
+# Returns whether a refresh found every new result, rather than stopping at
+# REFRESH_MAX_NEW
+# =============================================================================
+def refresh_complete(results):
+    return len(results)<REFRESH_MAX_NEW
+
+# =============================================================================
+# Describes the new results a refresh found
+# =============================================================================
+def refresh_summary(results):
+    if refresh_complete(results):
+        return f"{len(results)} new result(s)"
+    return f"{len(results)} new result(s), the most one refresh adds (refresh again for the rest)"
+
+# =============================================================================
+# Refreshes the saved searches with the names given (every saved search if
+# none are given) at the same time and prints what each one found. Returns 0
+# if they were all refreshed, 1 otherwise. Run with
+# 'python main_project.py --refresh-saved [<name> ...]'
+# =============================================================================
+def refresh_all_saved(names=None):
+    try:
+        store = get_saved_store()
+        searches = store.searches()
+    except sqlite3.Error as e:
+        print(f"Could not open the saved searches: {e}")
+        return 1
+    if names:
+        missing = set(names) - {search['Name'] for search in searches}
+        for name in sorted(missing):
+            print(f"{name}: no saved search with this name")
+        searches = [search for search in searches if search['Name'] in names]
+    else:
+        missing = set()
+    failed = len(missing)
+    with ThreadPoolExecutor(max_workers=max(1, BATCH_WORKERS)) as pool:
+        refreshes = {pool.submit(refresh_saved_search, search['Id'], store): search['Name'] for search in searches}
+        for future in as_completed(refreshes):
+            name = refreshes[future]
+            try:
+                print(f"{name}: {refresh_summary(future.result())}")
+            except Exception as e:
+                print(f"{name}: failed ({e})")
+                failed += 1
+    return 0 if failed==0 else 1
+
+# =============================================================================
+# Prints the refreshes of a saved search, or the results one of them added
+# if its id is given. Returns the exit status. Run with
+# 'python main_project.py --saved-runs <name> [<run id>]'
+# =============================================================================
+def show_saved_runs(name, run_id=None):
+    try:
+        store = get_saved_store()
+        search = next((search for search in store.searches() if search['Name']==name), None)
+        if search==None:
+            print(f"There is no saved search called '{name}'")
+            return 1
+        runs = store.runs(search['Id'])
+        if run_id==None:
+            print(tabulate.tabulate([[run['Id'], run['Started'], run['Finished'], run['Pages'], run['Added'],
+                                      "Yes" if run['Complete'] else "No"] for run in runs],
+                                    headers=['Run', 'Started', 'Finished', 'Pages read', 'Results added', 'Complete']))
+            return 0
+        if int(run_id) not in [run['Id'] for run in runs]:
+            print(f"'{name}' has no run {run_id}")
+            return 1
+        results = store.run_results(int(run_id))
+    except (ValueError, sqlite3.Error) as e:
+        print(e)
+        return 1
+    if len(results)==0:
+        print(f"Run {run_id} of '{name}' added no results")
+    else:
+        print_results(results, [search['Sources']], search['Keywords'])
+    return 0
+
+# =============================================================================
+# Prints the saved results from an organisation, in every saved search or
+# only the one named. Returns the exit status. Run with
+# 'python main_project.py --saved-by <organisation> [<name>]'
+# =============================================================================
+def show_saved_by(organisation, name=None):
+    try:
+        store = get_saved_store()
+        names = {search['Id']: search['Name'] for search in store.searches()}
+        search_id = None
+        if name!=None:
+            search_id = next((id for id in names if names[id]==name), None)
+            if search_id==None:
+                print(f"There is no saved search called '{name}'")
+                return 1
+        results = store.results_by(organisation, search_id)
+    except sqlite3.Error as e:
+        print(e)
+        return 1
+    if len(results)==0:
+        print(f"No saved results are from '{organisation}'")
+        return 0
+    print(tabulate.tabulate([[names[elem['Search']], elem['Title'], elem['URL'], elem['Date Published']] for elem in results],
+                            headers=['Search', 'Title', 'URL', 'Date Published']))
+    return 0
+
+#------------------------- Searching without the tool -------------------------
+
+# =============================================================================
+# Settings for running a file of searches. BATCH_WORKERS searches are run at
+# the same time, sharing the page cache and the blog counts. A search without
+# a maximum number of results returns at most BATCH_MAX_RESULTS
+# =============================================================================
+BATCH_WORKERS = int(os.environ.get('GREY_REVIEW_BATCH_WORKERS', 4))
+BATCH_MAX_RESULTS = 100
+SEARCH_ORDERS = ["Relevance", "Newest First", "Oldest First"]
+BATCH_FIELDS = ['Query', 'Title', 'URL', 'Departments, Agencies, and Public bodies', 'Abstract',
+                'Last Updated', 'Date Published']
+
+# =============================================================================
+# Returns the departments, agencies and public bodies with the names given,
+# the blogs of any of them that can be searched, and the names that are not
+# known. A name ending in "+" also selects every agency and public body that
+# works with that department
+# =============================================================================
+def select_organisations(names):
+    records = []
+    blogs = []
+    unknown = []
+    seen = set()
+    for name in names:
+        name = name.strip()
+        if name=='':
+            continue
+        title = author_resolver.resolve(name.rstrip("+"))
+        if title==None:
+            unknown.append(name)
+            continue
+        group = [catalogue['title_index'][title]]
+        if name.endswith("+") and group[0].get('Works with', 'None')!='None':
+            group += group[0]['Works with']
+        for record in group:
+            if record['Title'].strip() in seen:
+                continue
+            seen.add(record['Title'].strip())
+            records.append(record)
+            if record['Title'].strip() in catalogue['blog_index']:
+                blogs.append(catalogue['blog_index'][record['Title'].strip()])
+    return records, blogs, unknown
+
+# =============================================================================
+# Returns a date (DD/MM/YYYY) given in a search, or None if it is empty.
+# Raises ValueError if it is not a date
+# =============================================================================
+def query_date(text):
+    text = (text or '').strip()
+    if text=='':
+        return None
+    datetime.strptime(text, '%d/%m/%Y')
+    return text
+
+# =============================================================================
+# Turns a search read from a file into the values the search is run with.
+# Organisations may be a list or a string of names separated by ";". Raises
+# ValueError listing everything that is wrong with it
+# =============================================================================
+def parse_query(row, number):
+    name = str(row.get('Name') or f"Search {number}").strip()
+    problems = []
+    names = row.get('Organisations') or []
+    if isinstance(names, str):
+        names = names.split(";")
+    records, blogs, unknown = select_organisations(names)
+    if len(unknown)>0:
+        problems.append(f"unknown organisations {unknown}")
+    elif len(records)==0:
+        problems.append("no organisations")
+    keywords = str(row.get('Keywords') or '').strip()
+    if keywords=='':
+        problems.append("no keywords")
+    dates = []
+    for column in ('Start date', 'End date'):
+        try:
+            dates.append(query_date(row.get(column)))
+        except ValueError:
+            problems.append(f"'{column}' is not DD/MM/YYYY")
+            dates.append(None)
+    sort_by = str(row.get('Sort by') or SEARCH_ORDERS[0]).strip()
+    if sort_by not in SEARCH_ORDERS:
+        problems.append(f"'Sort by' is not one of {SEARCH_ORDERS}")
+    try:
+        max_results = int(row.get('Max results') or BATCH_MAX_RESULTS)
+    except ValueError:
+        problems.append("'Max results' is not a number")
+        max_results = 0
+    if len(problems)>0:
+        raise ValueError(f"{name}: " + "; ".join(problems))
+    return {'Name': name, 'Organisations': records, 'Blogs': blogs, 'Keywords': keywords,
+            'Start date': dates[0], 'End date': dates[1], 'Sort by': sort_by, 'Max results': max_results}
+
+# =============================================================================
+# Reads a file of searches, one per row of a CSV file or one JSON object per
+# line of a .jsonl file, with the columns Name, Organisations, Keywords,
+# Start date, End date, Sort by and Max results. Returns the searches that
+# can be run and the problems with those that cannot
+# =============================================================================
+def read_queries(path):
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith('.jsonl'):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f, skipinitialspace=True))
+    queries = []
+    problems = []
+    for number, row in enumerate(rows, 1):
+        try:
+            queries.append(parse_query(row, number))
+        except ValueError as e:
+            problems.append(str(e))
+    return queries, problems
 
 # =============================================================================
-# Retrieves total number of results
+# Runs one search from read_queries and returns its results
 # =============================================================================
-def get_total_results(link, selected_blogs=None):
-    html = requests.get(link, headers=headers).text
-    data = BeautifulSoup(html, 'html.parser')
-    try:
-        no_results = data.find("div", {"class": "result-info__header"}).text.strip().split(" ")
-        if int(no_results[0].replace(',',''))==0:
-          return None
-        if selected_blogs!=None:
-            no_results = int(no_results[0].replace(',',''))
-            for elem in selected_blogs:
-                number = 0
-                if elem[0]['Number']=="MANUAL":
-                    print("is manual")
-                    number = find_blog_number(elem)
-                else:
-                    blog = elem[0]
-                    link = elem[1]
-                    try:
-                        conn = requests.get(link, headers=headers)
-                        html = conn.text
-                        soup = BeautifulSoup(html, 'html.parser')
-                        b_num_results = blog['Number'].split(" ")
-                        if len(b_num_results)>3:
-                            temp = " ".join(b_num_results[1:-1])
-                            b_num_results = [b_num_results[0], temp, b_num_results[-1]]
-                        i = soup.find(b_num_results[0], {'class': b_num_results[1]})
-                        number = i.text.strip().split(" ")[int(b_num_results[2])].strip()
-                        number = int(number.replace(',',''))
-                    except:
-                        number = 0
-                if number==0:
-                    selected_blogs.remove(elem)
-                no_results += number
-        else:        
-            no_results = int(no_results[0].replace(',',''))     
-        return no_results, selected_blogs
-    except:
-      return None, None
+def run_query(query, job=None):
+    session = SearchSession(query['Organisations'], query['Keywords'], query['Start date'], query['End date'],
+                            query['Sort by'], query['Blogs']).count(job)
+    if session.total==None:
+        return []
+    return session.run(min(query['Max results'], session.total), job)
 
 # =============================================================================
-# Returns a list of results that does not contain any duplicates
+# Runs every search in a file of searches (see read_queries) at the same time
+# and writes their results to out, as JSON lines or as CSV if it ends in .csv.
+# Each result is labelled with the name of its search in 'Query'. Returns 0 if
+# every search was run, 1 otherwise. Run with
+# 'python main_project.py --batch <searches file> [<results file>]'
 # =============================================================================
-def remove_dupes(result):
-    seen = set()
-    new_l = []
-    for d in result:
-        if type(d['Departments, Agencies, and Public bodies'])==list:
-            d['Departments, Agencies, and Public bodies'] = tuple(d['Departments, Agencies, and Public bodies'])
-        t = tuple(d.items())
-        if t not in seen:
-            seen.add(t)
-            new_l.append(d)
-    for i in range(len(new_l)):
-        if type(new_l[i]['Departments, Agencies, and Public bodies'])==tuple:
-            new_l[i]['Departments, Agencies, and Public bodies'] = list(new_l[i]['Departments, Agencies, and Public bodies'])
-        
-    return new_l
+def run_batch(path, out=None):
+    try:
+        queries, problems = read_queries(path)
+    except (OSError, ValueError) as e:
+        print(f"Could not read the searches in {path}: {e}")
+        return 1
+    for problem in problems:
+        print(f"Skipped {problem}")
+    if out==None:
+        out = os.path.splitext(path)[0]+"_results.jsonl"
+    as_csv = out.lower().endswith('.csv')
+    failed = len(problems)
+    with open(out+".tmp", 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, BATCH_FIELDS, extrasaction='ignore') if as_csv else None
+        if writer!=None:
+            writer.writeheader()
+        with ThreadPoolExecutor(max_workers=max(1, BATCH_WORKERS)) as pool:
+            searches = {pool.submit(run_query, query): query['Name'] for query in queries}
+            for future in as_completed(searches):
+                name = searches[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"{name}: failed ({e})")
+                    failed += 1
+                    continue
+                for elem in results:
+                    row = {'Query': name, **elem}
+                    if writer!=None:
+                        authors = row['Departments, Agencies, and Public bodies']
+                        if isinstance(authors, list):
+                            row['Departments, Agencies, and Public bodies'] = ", ".join(authors)
+                        writer.writerow(row)
+                    else:
+                        f.write(json.dumps(row)+"\n")
+                f.flush()
+                print(f"{name}: {len(results)} result(s)")
+    os.replace(out+".tmp", out)
+    print(f"Results written to {out}")
+    return 0 if failed==0 else 1
 
+# =============================================================================
+# Settings for watching saved searches: how many are refreshed at the same
+# time, how many requests each host gets at once and how far apart they
+# start (across every refresh), how much each interval varies at random, how
+# long to wait before trying a failed search again (doubling with each
+# failure, but never beyond its interval), how often to check for searches
+# that are due and where to write what they find
+# =============================================================================
+WATCH_WORKERS = int(os.environ.get('GREY_REVIEW_WATCH_WORKERS', 2))
+WATCH_HOST_CONCURRENCY = int(os.environ.get('GREY_REVIEW_WATCH_HOST_CONCURRENCY', 2))
+WATCH_HOST_INTERVAL = float(os.environ.get('GREY_REVIEW_WATCH_HOST_INTERVAL', 0.5))
+WATCH_JITTER = 0.1
+WATCH_RETRY_AFTER = 15 * 60
+WATCH_POLL = 30
+WATCH_DIGEST_DIR = os.environ.get('GREY_REVIEW_WATCH_DIR', 'watch_digests')
 
 # =============================================================================
-# Returns a list containing all the related literature given the max number of
-# results provided by the user
+# Returns when a watched search is next due, interval_days after 'now' give
+# or take WATCH_JITTER of the interval so that searches watched together
+# drift apart. After 'failures' failures in a row it is tried again sooner
 # =============================================================================
-def get_pubs(df, link, max_results, blogs=None):
-  html = requests.get(link, headers=headers).text
-  data = BeautifulSoup(html, 'html.parser')
-  result = []
-  index=1
-  while True:
-    result += get_list_govuk(df, data)
-    # for res in result:
-    #     print(res)
-    index += 1
-    if blogs:
-        for i in range(len(blogs)):
-            result += read_blog_page(blogs[i][1], blogs[i][0])
-            blogs[i][1] = next_blog_page(blogs[i][1], blogs[i][0])
-    result = remove_dupes(result)
-    if len(result)>=max_results:
-      if len(result)>max_results:
-        result = result[:(max_results)]
-      break
-    else:
-      link = link[:-1]+str(index)
-      html = requests.get(link, headers=headers).text
-      data = BeautifulSoup(html, 'html.parser')
-  return result
+def next_watch_run(now, interval_days, failures=0):
+    seconds = interval_days * 24 * 60 * 60
+    if failures>0:
+        seconds = min(seconds, WATCH_RETRY_AFTER * 2**(failures-1))
+    return now + dt.timedelta(seconds=seconds * random.uniform(1-WATCH_JITTER, 1+WATCH_JITTER))
 
 # =============================================================================
-# Prints the gathered results and the departments and search terms that the 
-# results were based on
+# Watches the saved search with the name given, refreshing it every
+# interval_days. The first refresh is due at a random time within the first
+# WATCH_JITTER of the interval so that searches added together are spread out
 # =============================================================================
-def print_results(result, refined, search_terms):
-    print(f"Here is the {len(result)} result(s) when searching \"{search_terms}\"")
-    header = result[0].keys()
-    rows = [value.values() for value in result]
-    print(tabulate.tabulate(rows, header))
+def add_watch(name, interval_days, store=None):
+    if store==None:
+        store = get_saved_store()
+    if interval_days<=0:
+        raise ValueError("The interval must be more than 0 days")
+    search = next((search for search in store.searches() if search['Name']==name), None)
+    if search==None:
+        raise ValueError(f"There is no saved search called '{name}'")
+    first_run = datetime.now() + dt.timedelta(seconds=random.uniform(0, WATCH_JITTER * interval_days * 24 * 60 * 60))
+    store.set_watch(search['Id'], interval_days, first_run)
+    return first_run
 
-try:
-  titles = [elem['Title'] for elem in df]
-except:
-  titles = list(df['Title'])
+# =============================================================================
+# Writes the new results a refresh of a watched search found to a JSON file
+# in WATCH_DIGEST_DIR named after the search and when it was refreshed.
+# Returns the path of the file
+# =============================================================================
+def write_digest(watch, results, directory=WATCH_DIGEST_DIR):
+    os.makedirs(directory, exist_ok=True)
+    now = datetime.now()
+    name = re.sub(r'[^\w-]+', '_', watch['Name']).strip('_') or str(watch['Id'])
+    path = os.path.join(directory, f"{name}_{now.strftime('%Y%m%d-%H%M%S')}.json")
+    digest = {'Search': watch['Name'], 'Refreshed': now.isoformat(timespec='seconds'),
+              'New results': len(results), 'Results': results}
+    with open(path+".tmp", 'w', encoding='utf-8') as f:
+        json.dump(digest, f, indent=2)
+    os.replace(path+".tmp", path)
+    return path
 
 # =============================================================================
-# Creates the URL for a blog given a unique blog dictionary, search terms,
-# and other parameters
+# Refreshes the watched saved searches as they fall due until 'stop' is set
+# (or forever), WATCH_WORKERS at a time, with every request they send limited
+# per host by a shared HostLimiter. A digest is written for each refresh that
+# finds new results. A search whose pages could not all be read is tried
+# again sooner (see next_watch_run), and one that cannot be refreshed at all
+# is paused. When each search is next due is kept in the store, so
+# the watch carries on where it left off if it is restarted. Run with
+# 'python main_project.py --watch'
 # =============================================================================
-def create_blog_link(blog, search_terms, sdate=None, edate=None, order_by=None):
-  link = blog['Blog Link']+blog['Search']
-  if blog['Format']!="+":
-    return None
-  page = blog['Page']
-  if type(page)!=list or len(page)!=2:
-    return None
-  params = {blog['Keywords']: search_terms}
-  if page[0]!='AFTER':
-    params[page[0]] = page[1]
-  if order_by!=None:
-    ordered = order_by.split(" || ")
-    params[ordered[0]] = ordered[1] 
-  x = requests.get(link, headers=headers, params=params)
-  return x.url
+def watch_saved(stop=None):
+    global request_budget
+    if stop==None:
+        stop = threading.Event()
+    store = get_saved_store()
+    request_budget = HostLimiter(WATCH_HOST_CONCURRENCY, WATCH_HOST_INTERVAL)
+    running = {}
+    print(f"Watching {len(store.watches())} saved search(es)")
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, WATCH_WORKERS)) as pool:
+            while not stop.is_set():
+                busy = {watch['Id'] for watch in running.values()}
+                due = [watch for watch in store.watches(datetime.now()) if watch['Id'] not in busy]
+                for watch in due[:max(0, WATCH_WORKERS-len(running))]:
+                    running[pool.submit(refresh_saved_search, watch['Id'], store)] = watch
+                if len(running)==0:
+                    stop.wait(WATCH_POLL)
+                    continue
+                done, _ = wait(running, timeout=WATCH_POLL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    watch = running.pop(future)
+                    try:
+                        results = future.result()
+                    except ValueError as e:
+                        store.pause_watch(watch['Id'], f"{type(e).__name__}: {e}")
+                        print(f"{watch['Name']}: paused ({e}), watch it again once it is fixed")
+                        continue
+                    except Exception as e:
+                        failures = watch['Failures']+1
+                        next_run = next_watch_run(datetime.now(), watch['Interval'], failures)
+                        store.watch_ran(watch['Id'], next_run, f"{type(e).__name__}: {e}")
+                        print(f"{watch['Name']}: failed ({e}), trying again at {next_run:%Y-%m-%d %H:%M}")
+                        continue
+                    # A refresh that stopped at REFRESH_MAX_NEW is run again soon for the rest
+                    next_run = next_watch_run(datetime.now(), watch['Interval'], 0 if refresh_complete(results) else 1)
+                    store.watch_ran(watch['Id'], next_run)
+                    if len(results)>0:
+                        print(f"{watch['Name']}: {len(results)} new result(s) written to {write_digest(watch, results)}")
+                    if not refresh_complete(results):
+                        print(f"{watch['Name']}: stopped at {REFRESH_MAX_NEW} results, looking for the rest at {next_run:%Y-%m-%d %H:%M}")
+                    else:
+                        print(f"{watch['Name']}: no new results")
+    finally:
+        request_budget = None
+    return 0
 
 # =============================================================================
-# Returns list of lists containing a unique blog information dictionary and 
-# its corresponding URL
+# Adds, removes or lists watched saved searches, or watches them, from the
+# command line. Returns the exit status
 # =============================================================================
-def add_blog_links(blogs, search_terms, sdate=None, edate=None, order_by=None):
-  links = []
-  for blog in blogs:
-    URL = create_blog_link(blog, search_terms, sdate, edate, None)#order_by)
-    if [blog, URL] not in links:
-        links.append([blog, URL])
-  return links
+def watch_command(args):
+    try:
+        store = get_saved_store()
+        if len(args)==0:
+            return watch_saved()
+        if args[0]=='add' and len(args)==3:
+            first_run = add_watch(args[1], float(args[2]), store)
+            print(f"Watching '{args[1]}' every {args[2]} day(s), first at {first_run:%Y-%m-%d %H:%M}")
+            return 0
+        if args[0]=='remove' and len(args)==2:
+            watched = [watch for watch in store.watches() if watch['Name']==args[1]]
+            if len(watched)==0:
+                print(f"'{args[1]}' is not being watched")
+                return 1
+            store.remove_watch(watched[0]['Id'])
+            return 0
+        if args[0]=='list' and len(args)==1:
+            rows = [[watch['Name'], watch['Interval'], watch['Next run'] or "Paused", watch['Last run'], watch['Failures'], watch['Last error']]
+                    for watch in store.watches()]
+            print(tabulate.tabulate(rows, headers=['Search', 'Every (days)', 'Next run', 'Last run', 'Failures', 'Last error']))
+            return 0
+    except (ValueError, sqlite3.Error) as e:
+        print(e)
+        return 1
+    except KeyboardInterrupt:
+        return 0
+    print("Usage: main_project.py --watch [add <name> <days> | remove <name> | list]")
+    return 1
 
+#------------------------ Front-end of Search Tool ----------------------------
 
 # =============================================================================
-# Returns number of results from a select URL
+# How often (in milliseconds) the window checks on a background job
 # =============================================================================
-def get_manual_number(link, reading, search_link=None):
-  try:
-    x = requests.get(link, headers=headers)
-    html = x.text
-    soup = BeautifulSoup(html, 'html.parser')
-    i = soup.find(reading[0][0], {'class': reading[0][1]})
-    links = []
-    for j in i.find_all('a'):
-      if j['href'] not in links:
-        if search_link!=None:
-          if j['href'][0]!='#' and not(j['href'].startswith(search_link)):
-            links.append(j['href'])
-        else:
-          links.append(j['href'])
-    return len(links)
-  except:
-    return None
+JOB_POLL_MS = 100
 
 # =============================================================================
-# If the page number is inside the URL, this function increments the page number
-# by the correct increment number and returns the updated URL
+# Returns the text shown while a background job is running
 # =============================================================================
-def next_page_inner(link, snippet, increment):
-  try:
-    ind = link.index(snippet)
-    first_half = link[:ind]
-    sect = link[ind+len(snippet):]
-    counter = 1
-    number = 0
-    while True:
-      try:
-        number = int(sect[:counter])
-        counter += 1
-      except:
-        counter -= 1
-        break
-    number = number + increment
-    result = first_half + snippet + str(number) + sect[counter:]
-    return result
-  except:
-    return None
+def describe_progress(title, counts):
+    parts = []
+    if 'Pages' in counts:
+        parts.append(f"{counts['Pages']} page(s) fetched")
+    if 'Target' in counts:
+        parts.append(f"{counts.get('Results', 0)} of {counts['Target']} result(s) found")
+    if 'Enriched' in counts:
+        parts.append(f"{counts['Enriched']} document(s) read")
+    if counts.get('Duplicates'):
+        parts.append(f"{counts['Duplicates']} duplicate(s) removed")
+    if 'Blogs counted' in counts:
+        parts.append(f"{counts['Blogs counted']} blog(s) counted")
+    text = f"{title}...\n" + ", ".join(parts)
+    if counts.get('ETA')!=None:
+        text += f"\nAbout {math.ceil(counts['ETA'])} second(s) left"
+    return text
 
 # =============================================================================
-# Given a link and the corresponding information regarding how to retrieve the information,
-#  the tool returns the number of results if the 'get_total_results' calls it
+# Runs func(*args) as a BackgroundJob while its progress is shown with a
+# Cancel button. on_done is called with the result once it finishes, on_error
+# (if given) with the error if it fails and on_results (if given) with every
+# batch of results the job posts, all on the Tk thread. The progress is shown
+# in a small window that blocks the rest of the tool, or inside parent (a
+# frame) if one is given so that the tool can be used while the job runs.
+# The job is cancelled if parent is removed from the window
 # =============================================================================
-def find_blog_number(elem):
-    blog = elem[0]
-    link = elem[1]
-    if blog['Search Link']=='None':
-      search_link = None
+def run_job(title, func, args, on_done, on_error=None, on_results=None, parent=None):
+    job = BackgroundJob()
+    if parent==None:
+        dialog = tk.Toplevel(root, bg=main_bg)
+        dialog.title(title)
+        dialog.transient(root)
+        label = tk.Label(dialog, text=f"{title}...", bg=main_bg, font=("Arial 14"), width=50, height=4)
+        label.pack(padx=20, pady=10)
     else:
-      search_link = blog['Search Link']
-    number = 0
-    reading = []
-    find_results = blog['Results'].split("\n")
-    for elem in find_results:
-      elem = elem.split(" ")
-      if len(elem)>2:
-        temp = " ".join(elem[0:])
-        elem = [elem[0], temp]
-      reading.append(elem)
-    while True:
-      result_num = get_manual_number(link, reading, search_link)
-      if result_num==None or result_num==0:
-        return number
-      number += result_num
-      link = next_page_inner(link, 'page/', 1)
-    return number
+        dialog = parent
+        label = tk.Label(parent, text=f"{title}...", bg=main_bg, font=("Arial 13"))
+        label.pack(side=tk.LEFT, padx=10)
 
-# =============================================================================
-# Given a link and the corresponding information regarding how to retrieve the information,
-#  the tool updates the link to point to the next page
-# =============================================================================
-def next_blog_page(link, blog):
-    if blog['Page'][0]=='AFTER':
-        return next_page_inner(link, blog['Page'][1], blog['Page Increment'])
-    l = [-10, -9, -8, -7, -6, -5, -4, -3, -2, -1]
-    page = 0
-    count = -1
-    for i in l:
-        try:
-            page = int(link[i:])
-            count = i
-            break
-        except:
-            pass
-    increment = int(blog['Page Increment'])
-    return link[:count]+str(page+increment)
+    def cancel():
+        job.cancel()
+        label.configure(text="Cancelling...")
+        cancel_button['state'] = 'disabled'
 
-# =============================================================================
-# Given a link and the corresponding information regarding how to retrieve the information,
-#  the tool returns all possible information
-# =============================================================================
-def read_blog_page(link, blog):
-    date="N/A"
-    results = []
-    conn = requests.get(link, headers=headers)
-    
-    # If there is no successful connection, return nothing
-    if conn.status_code!=200:
-        return None
-    html = conn.text
-    soup = BeautifulSoup(html, 'html.parser')
-    find_results = blog['Results'].split("\n")
-    first_filter = find_results[0].split(" ")
-    if len(first_filter)>2:
-        temp = " ".join(first_filter[0:])
-        first_filter = [first_filter[0], temp]
-    scnd_filter = find_results[1].split(" ")[0]
-    # filter html text to find section containing results
-    i = soup.find(first_filter[0], {'class': first_filter[1]})
-    if i==None:
-        return results
-    
-    # Find any possible dates for the existing features
-    dates = []
-    if blog['Date']!='None' and len(blog['Date'])!=0:
-        if blog['Date']!='None' and len(blog['Date'])!=0:
-            d_format = blog['Date'].split(" ")
-            print(d_format)
-            for d in i.find_all(d_format[0], {'class': d_format[1]}):
-                try:
-                  found = d.text.strip()
-                  d_setup = found.split(" ")
-                  if len(d_setup[2])==2:
-                    d_setup[2] = "20"+d_setup[2]
-                  d_setup[1] = d_setup[1][:3]
-                  found = " ".join(d_setup)
-                  p = dt.strptime(found, '%d %b %Y')
-                  day = ""
-                  s_day, s_month, s_year = str(p.day), str(p.month), str(p.year)
-                  if len(s_day)==1:
-                    day+="0"
-                  day+=f"{s_day}/"
-                  if len(s_month)==1:
-                    day+="0"
-                  day+=f"{s_month}/{s_year}"
-                except:
-                  day = "N/A"
-                dates.append(day)
-    counter = 0
-    page_links = []
-    for j in i.find_all(scnd_filter):
-        if blog['Search Link']!='None' and len(blog['Search Link'])!=0:
-            if j['href'][0]=='#' or j['href'].startswith(blog['Search Link']):
+    cancel_button = tk.Button(dialog, text="Cancel", command=cancel, highlightbackground=main_bg)
+    if parent==None:
+        cancel_button.pack(pady=10)
+        dialog.protocol("WM_DELETE_WINDOW", cancel)
+        dialog.grab_set()
+    else:
+        cancel_button.pack(side=tk.LEFT, padx=10)
+
+    def poll():
+        if parent!=None and not parent.winfo_exists():
+            job.cancel()
+            return
+        while True:
+            try:
+                kind, value = job.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind=='progress':
+                if not job.cancelled.is_set():
+                    label.configure(text=describe_progress(title, value))
                 continue
-        if 'http' in j['href'][:6]:
-            URL = j['href']
-        else:
-            if j['href'][0]=="/":
-                URL = blog['Blog Link'][:-1] + j['href']
+            if kind=='results':
+                if on_results!=None:
+                    on_results(value)
+                continue
+            if parent==None:
+                dialog.grab_release()
+                dialog.destroy()
             else:
-                URL = blog['Blog Link'] + j['href']
-        #if URL in page_links:
-        #   continue
-        if len(dates)>0:
-            try:
-                date=dates[counter]
-            except:
-                date="N/A"
-        blog_title = j.text.strip().replace('\n', '')
-        blog_title = re.sub(' +', ' ', blog_title)
-        entry = {
-            'Title': blog_title,
-            'URL': URL,
-            'Departments, Agencies, and Public bodies': blog['Title'],
-            "Abstract": "N/A",
-            "Last Updated": "N/A",
-            'Date Published': date}
-        results.append(entry)
-        page_links.append(URL)
-        counter += 1
-    return results
+                cancel_button.destroy()
+                label.configure(text="Cancelled" if kind=='cancelled' else "Finished")
+            if kind=='done':
+                on_done(value)
+            elif kind=='error':
+                if on_error!=None:
+                    on_error(value)
+                else:
+                    messagebox.showwarning("Something went wrong", f"{title} failed: {value}")
+            return
+        root.after(JOB_POLL_MS, poll)
 
+    job.start(func, *args)
+    root.after(JOB_POLL_MS, poll)
+    return job
 
 # =============================================================================
-# Adds a hyperlink to a paragraph in a word document
+# Exports the selected results to Excel in the background
 # =============================================================================
-def add_hyperlink(paragraph, text, url):
-  # This gets access to the document.xml.rels file and gets a new relation id value
-  part = paragraph.part
-  r_id = part.relate_to(url, docx.opc.constants.RELATIONSHIP_TYPE.HYPERLINK, is_external=True)
-
-  # Create the w:hyperlink tag and add needed values
-  hyperlink = docx.oxml.shared.OxmlElement('w:hyperlink')
-  hyperlink.set(docx.oxml.shared.qn('r:id'), r_id, )
-
-  # Create a new run object (a wrapper over a 'w:r' element)
-  new_run = docx.text.run.Run(docx.oxml.shared.OxmlElement('w:r'), paragraph)
-  new_run.text = text
-
-  # Alternatively, set the run's formatting explicitly
-  new_run.font.color.rgb = docx.shared.RGBColor(0, 0, 255)
-  new_run.font.underline = True
+def export_to_excel(results):
+    if len(results)==0:
+        messagebox.showwarning("No results selected", "Please select at least one of the produced results")
+        return
+    run_job("Exporting to Excel", write_excel, (results,),
+            lambda count: messagebox.showinfo("Excel File create successfully", f"New 'out.xlsx' file created at {os.getcwd()} containing {count} result(s)."),
+            lambda err: messagebox.showwarning('Failed to create Excel file', "Could not create a new Excel file"))
 
-  # Join all the xml elements together
-  hyperlink.append(new_run._element)
-  paragraph._p.append(hyperlink)
-  return hyperlink
+# =============================================================================
+# Exports the selected results to Word in the background
+# =============================================================================
+def export_to_word(results, last_updated=False):
+    if len(results)==0:
+        messagebox.showwarning("No results selected", "Please select at least one of the produced results")
+        return
+    run_job("Exporting to Word", write_word, (results, 'out.docx', last_updated),
+            lambda count: messagebox.showinfo("Word document create successfully", f"New 'out.docx' file created at {os.getcwd()} containing {count} result(s)."),
+            lambda err: messagebox.showwarning('Failed to create Word document', "Could not create a new Word document"))
 
-#------------------------ Front-end of Search Tool ----------------------------
 
 # Second page of the tool
 def apply_settings():
     global tool_page_num
     tool_page_num = 2
     # ---- Creates list of departments that were selected by the user
-    global selected_blogs
     selected_blogs = []
-    selected_indices = [index for index, var in enumerate(check_vars) if var.get() == 1]
+    selected_indices = picker.selected_rows()
     chosen_titles = []
     chosen_indices = []
+    seen = set()
     for index in selected_indices:
-      if titles[index]=="All associated agencies and public bodies below":
-        #if titles[index-1] not in chosen_titles:
-        #  chosen_titles.append(titles[index-1])
-        #  chosen_indices.append(index-1)
-        counter = 1
-        while True:
-          if "\t" in titles[index+counter]:
-            if titles[index+counter].strip() not in chosen_titles:
-              chosen_titles.append(titles[index+counter].strip())
-              chosen_indices.append(index+counter)
-          else:
-            break
-          counter += 1
+      # A marker row selects every agency and public body listed below it
+      if titles[index]==ASSOCIATED_MARKER:
+        group = catalogue['children'][index]
       else:
-        if titles[index] not in chosen_titles:
-          chosen_titles.append(titles[index])
-          chosen_indices.append(index)
-    global departments
-    departments = chosen_titles
-    for elem in departments:
-        if elem.strip() in blog_titles:
-            print(elem.strip())
+        group = [index]
+      for i in group:
+        if titles[i].strip() not in seen:
+          seen.add(titles[i].strip())
+          chosen_titles.append(titles[i].strip())
+          chosen_indices.append(i)
+    for elem in chosen_titles:
+        if elem in catalogue['blog_index']:
+            print(elem)
             print("HAS REACHABLE BLOG POST")
-            blog_index = blog_titles.index(elem.strip())
-            selected_blogs.append(all_blogs[blog_index])
+            selected_blogs.append(catalogue['blog_index'][elem])
             
-    selected_data = [full_df[index] for index in chosen_indices]
+    selected_data = [catalogue['title_records'][index] for index in chosen_indices]
     
     # ---- Clears the screen
     for widget in root.winfo_children():
@@ -723,7 +3642,7 @@ def apply_settings():
     
     value_inside = tk.StringVar()
     value_inside.set("Select an Option")
-    options = ["Relevance", "Newest First", "Oldest First"]
+    options = SEARCH_ORDERS
     
     sort_label = tk.Label(root, text="\nSelect order of results", bg=main_bg, font=("Arial 16"))
     sort_label.pack()
@@ -738,10 +3657,12 @@ def apply_settings():
     end_date = tk.Entry(root, highlightbackground=main_bg)
 
     show = False
+    # The search counted last, counted again when coming back from the results
+    session = None
 
     # ---- Start and end date prompts appear using this function
     def show_dates():
-        global show
+        nonlocal show
         show = True
         sdate_label.pack(before=eas_submit_button)
         start_date.pack(pady=5, before=eas_submit_button)
@@ -751,7 +3672,7 @@ def apply_settings():
     
     # ---- Start and end date prompts are hidden using this function
     def hide_dates():
-        global show
+        nonlocal show
         show = False
         sdate_label.pack_forget()
         start_date.pack_forget()
@@ -765,11 +3686,7 @@ def apply_settings():
         tool_page_num = 3
         
         # ---- Retrieves information given by user
-        global keywords
-        global sdate
-        global edate
-        global sort_by
-        
+        nonlocal session
         try:
             keywords = keyword_entry.get()
             sdate = start_date.get()
@@ -777,8 +3694,10 @@ def apply_settings():
             #topic_value = topic_entry.get()
             sort_val = value_inside.get()
             sort_by = sort_val
-        except:
-            pass
+        except tk.TclError:
+            # ---- The entries are gone when coming back from the results, so the last search is counted again
+            run_job("Counting results", session.count, (), show_max_results)
+            return
         
         # Given two dates (format DD/MM/YYYY), it checks if date1 < date2
         def compare_dates(date1, date2):
@@ -836,19 +3755,13 @@ def apply_settings():
         # ---- Generates keywords based on the title/topic provided by the user (currently not in use as it does not connect to a generative AI model)
         # keywords = generate_keywords(title, keywords)
         
-        # ---- Given the information by the user, the URL is created and used to retrieve the total possible results
-        URL = govuk_pubs_link(selected_data, keywords, sdate, edate, sort_by)
-        
-        global selected_blogs
-        global blogs
-        if len(selected_blogs)>0:
-            print("CREATE BLOG URLS HERE")
-            # MAKE BLOG URLS HERE
-            blogs = add_blog_links(selected_blogs, keywords, sdate, edate, sort_by)
-        else:
-            blogs = None
-        
-        total_results, blogs = get_total_results(URL, blogs)
+        # ---- Given the information by the user, the search links are created and used to retrieve the total possible results in the background
+        session = SearchSession(selected_data, keywords, sdate, edate, sort_by, selected_blogs)
+        run_job("Counting results", session.count, (), show_max_results)
+
+    # ---- Shows the number of results found once they have been counted
+    def show_max_results(counted):
+        total_results = counted.total
         
         # ---- If there are no results, user is asked to give new values and try again
         if total_results==None:
@@ -885,60 +3798,10 @@ def apply_settings():
                 messagebox.showwarning("Input Error", "Please enter a sensible number")
                 return
             
-            # Exports the selected results to Excel
-            def export_results():
-                selected_indices = [index for index, var in enumerate(check_vars_in) if var.get() == 1]
-                selected_results = [result[index] for index in selected_indices]
-                
-                # Checks if the select all option was selected
-                if len(selected_results)==0:
-                    messagebox.showwarning("No results selected", "Please select at least one of the produced results")
-                    return
-                
-                if (len(selected_results)==1 and selected_results[0]=="Select all") or selected_results[0]=="Select all":
-                    selected_results = result[1:]
-                
-                max_results = len(selected_results)
-                pd_results = pd.DataFrame(selected_results)
-                
-                try:
-                    pd_results.to_excel('out.xlsx', index=False)
-                    messagebox.showinfo("Excel File create successfully", f"New 'out.xlsx' file created at {os.getcwd()} containing {max_results} result(s).")
-                except:
-                    messagebox.showwarning('Failed to create Excel file', "Could not create a new Excel file")
-                return
-            
-            # Exports the selected results to Word
-            def export_word():
-                selected_indices = [index for index, var in enumerate(check_vars_in) if var.get() == 1]
-                results = [result[index] for index in selected_indices]
-                
-                if len(results)==0:
-                    messagebox.showwarning("No results selected", "Please select at least one of the produced results")
-                    return 
-                
-                if (len(results)==1 and results[0]=="Select all") or results[0]=="Select all":
-                    results = result[1:]
-                
-                max_results = len(results)
-                word_result = []
-                for i in range(len(results)):
-                    word_result.append([results[i]['Departments, Agencies, and Public bodies'], results[i]['Title'], results[i]['URL'], results[i]['Date Published'][-4:], results[i]['Last Updated'][-4:]])
-                try:
-                    doc = docx.Document()
-                    doc.add_heading('Results exported to Word')
-                    counter = 1
-                    for elem in word_result:
-                        p = doc.add_paragraph(f"{counter}. {elem[0]}. ")
-                        add_hyperlink(p, elem[1], elem[2])
-                        p.add_run(f" ({elem[3][-4:]})")
-                        counter += 1
-                    doc.save('out.docx')
-                    messagebox.showinfo("Word document create successfully", f"New 'out.docx' file created at {os.getcwd()} containing {max_results} result(s).")
-                except:
-                    messagebox.showwarning('Failed to create Word document', "Could not create a new Word document")
-                return
-            
+            show_results(max_results)
+        
+        # ---- Shows the results, adding them to the list as they are found
+        def show_results(max_results):
             def save_results_file():
                 excel_button.pack_forget()
                 word_button.pack_forget()
@@ -957,7 +3820,7 @@ def apply_settings():
                     return
                 
             
-            # Saves the current results to a new directory to be used later
+            # Saves the current results to the saved searches to be used later
             def save_results():
                 global entered_file
                 filename=""
@@ -966,47 +3829,16 @@ def apply_settings():
                 except:
                     messagebox.showwarning('Failed to retrieve filename', "Failed to retrieve filename")
                     return 
-                if not os.path.exists(os.getcwd()+"/saved_searches"):
-                    os.makedirs(os.getcwd()+"/saved_searches")
-                df = pd.DataFrame(result[1:])
-                global file_counter
-                global keywords
-                global sdate
-                global edate
-                global sort_by
-                global departments
-                for i in range(len(departments)):
-                    departments[i] = departments[i].strip()
-                s_departments = " ".join(departments)
                 today = dt.date.today().strftime('%Y-%m-%d')
-                # all_files = []
-                # if len(os.listdir(os.getcwd()+"/saved_searches"))>0:
-                #     for name in os.listdir(os.getcwd()+"/saved_searches"):
-                #         if name[0]!='.':
-                #             if name[:-4] not in all_files:
-                #                 all_files.append(name[:-4])
-                # if len(all_files)>0:
-                #     all_files.reverse()
-                #     for name in all_files:
-                #         if f"{today}_{file_counter}"==name:
-                #             file_counter += 1
                 filename = today+" "+filename
-                csv_path = os.getcwd()+"/saved_searches/"+filename+".csv"
-                txt_path = os.getcwd()+"/saved_searches/"+filename+".txt"
-                if os.path.exists(csv_path) or os.path.exists(txt_path):
-                    messagebox.showwarning('File already exists', "Filename already exists")
-                #filename = f"{today}_{file_counter}"
                 try:
-                    f = open(os.getcwd()+"/saved_searches/"+filename+".txt", "x")
-                    if sort_by=='Select an Option':
-                        sort_by = 'Relevance'
-                    f.write(f"Sources: {s_departments}\nKeywords: {keywords}\nStart date: {sdate}\nEnd date: {edate}\nSort by: {sort_by}")
-                    f.close()
-                    df.to_csv(os.getcwd()+"/saved_searches/"+filename+".csv", index=False)
-                    file_counter += 1
+                    get_saved_store().save(filename, view.results, counted.departments(), counted.keywords,
+                                           counted.sdate, counted.edate, counted.sort_by)
                     save_button['state'] = 'disabled'
-                    messagebox.showinfo("Search saved successfully", f"New '{filename}.txt' and '{filename}.csv' files created at {os.getcwd()}/saved_searches.")
-                except:
+                    messagebox.showinfo("Search saved successfully", f"'{filename}' saved to {os.path.abspath(SAVED_SEARCHES_PATH)}.")
+                except ValueError:
+                    messagebox.showwarning('File already exists', "Filename already exists")
+                except sqlite3.Error:
                     messagebox.showwarning('Failed to save results', "Failed to save results")
                 return
             
@@ -1021,49 +3853,27 @@ def apply_settings():
             title_label = tk.Label(root, text="Grey Review\n", bg=main_bg, font=("Arial 42 bold"), fg="#666666") # dark grey (bold as well?????)
             title_label.pack()
             
-            # ---- Returns list of results matching the information provided by the user
-            global blogs
-            result = get_pubs(full_df, URL, max_results, blogs)
-            top_l = ["Select all"]
-            result = top_l + result
-            
             tk.Label(root, text="Select the results you would like to be exported", bg=main_bg, font=("Arial 16")).pack()
-            tk.Label(root, text="Swipe along to read the full results", bg=main_bg, font=("Arial 13")).pack()
+            tk.Label(root, text="Click on a title to read the full result", bg=main_bg, font=("Arial 13")).pack()
             
-            text_inner = ScrolledText(root, width=110, height=25, font=("Arial 13"), cursor="arrow")
-            hyperlink = HyperlinkManager(text_inner)
-           
-            check_vars_in = []
+            # ---- Shows how the search is going, with a button to stop it
+            status_frame = tk.Frame(root, bg=main_bg)
+            status_frame.pack(pady=5)
             
-            for elem in result:
-               var = tk.IntVar()
-               check_vars_in.append(var)
-               in_text = ""
-               if elem=="Select all":
-                   in_text = elem
-               elif type(elem['Departments, Agencies, and Public bodies'])==list:
-                   for dep in elem['Departments, Agencies, and Public bodies']:
-                       in_text += dep+", "
-                   in_text = in_text.strip()[:-1]
-                   elem['Departments, Agencies, and Public bodies'] = in_text
-               else:
-                   in_text = elem['Departments, Agencies, and Public bodies']
-               cb = tk.Checkbutton(text_inner, text=f"{in_text}.", variable=var, anchor='w', bg='white')
-               text_inner.window_create('end', window=cb)
-               if in_text!="Select all":
-                   text_inner.insert(tk.END, f"{elem['Title']}",hyperlink.add(partial(webbrowser.open,elem['URL'])))
-                   text_inner.insert(tk.END, f" ({elem['Date Published'][-4:]})")
-                   text_inner.insert(tk.END, f" (Last Updated {elem['Last Updated'][-4:]})")
-               text_inner.insert('end', '\n')
-            text_inner.configure(state='disabled')
-            text_inner.pack()
+            view = ResultsView(root)
+            view.pack()
+            
+            # ---- Returns list of results matching the information provided by the user, gathered in the background and added as they arrive
+            def searched(count):
+                tk.Label(status_frame, text=f"{count} result(s) found", bg=main_bg, font=("Arial 13")).pack(side=tk.LEFT, padx=10)
+            run_job("Searching", counted.stream, (max_results,), searched, on_results=view.add, parent=status_frame)
                
             # ---- Exports selected results to Excel
-            excel_button = tk.Button(root, text="Export to Excel", command=export_results, highlightbackground=main_bg)
+            excel_button = tk.Button(root, text="Export to Excel", command=lambda: export_to_excel(view.selected()), highlightbackground=main_bg)
             excel_button.pack(pady=5)
             
             # ---- Exports selected results to Word
-            word_button = tk.Button(root, text="Export to Word", command=export_word, highlightbackground=main_bg)
+            word_button = tk.Button(root, text="Export to Word", command=lambda: export_to_word(view.selected()), highlightbackground=main_bg)
             word_button.pack(pady=5)
             
             save_button = tk.Button(root, text="Save Current Results", command=save_results_file, highlightbackground=main_bg)
@@ -1110,81 +3920,40 @@ def apply_settings():
 def use_saved():
     global tool_page_num
     tool_page_num = 5
-    if os.path.exists(os.getcwd()+"/saved_searches"):
-        
-        # Retrieves all saved files
-        all_files = os.listdir(os.getcwd()+"/saved_searches")
-        result = []
-        files = []
-        for name in all_files:
-            if name[0]!='.':
-                filename = name.split(".")[0]
-                if filename+".txt" in all_files and filename+".csv" in all_files and filename not in files:
-                    files.append(filename)
-                    saved_file = {}
-                    saved_file['filename'] = filename
-                    # all_files.remove(filename+".txt")
-                    # all_files.remove(filename+".csv")
-                    """f = open(os.getcwd()+"/saved_searches/"+filename+".txt", "r")
-                    content = f.read().split("\n")
-                    f.close()
-                    for elem in content:
-                        pair = elem.split(":")
-                        saved_file[pair[0]] = pair[1]"""
-                    with open(os.getcwd()+"/saved_searches/"+filename+".csv") as f:
-                        dataset = [{k: v for k, v in row.items()} for row in csv.DictReader(f, skipinitialspace=True)]
-                    saved_file['Data'] = dataset
-                    result.append(saved_file)
-        global saved_results
-        saved_results = result
-        for widget in root.winfo_children():
-            widget.destroy()
-        
-        
-        
-        # ---- Displays a checklist of existing departments
-        # ---- The user selects what departments they want to search
-        title_label = tk.Label(root, text="Grey Review\n", bg=main_bg, font=("Arial 42 bold"), fg="#666666") # dark grey (bold as well?????)
-        title_label.pack()
-        
-        saved_check_vars = []
-        
-        # ---- Displays a checklist of existing saved results
-        # ---- The user selects what departments they want to search
-        tk.Label(root, text="Select only one save file to load\n", bg=main_bg, font=("Arial 16")).pack()
-        
-        text = ScrolledText(root, width=90, height=32, cursor="arrow")
-        text.pack(fill=tk.Y)
-        
-        for data in result:
-            # saved_keys = data['Keywords']
-            # s_date = data['Start date']
-            # e_date = data['End date']
-            # sort = data['Sort by']
-            # if sort=="Select an Option":
-            #     sort = "Relevance"
-            # s_departments = data['Sources']
-            # s_deps = ""
-            # for dep in s_departments.split("||"):
-            #     s_deps += dep+", "
-            # s_deps = s_deps.strip()[:-1]
-            # if len(saved_keys)>10:
-            #     saved_keys = saved_keys[:10]+"..."
-            # if s_date=="None":
-            #     s_date = "N/A"
-            # if e_date=="None":
-            #     e_date ="N/A"
-            background = "white"
-            var = tk.IntVar()
-            saved_check_vars.append(var)
-            cb = tk.Checkbutton(text, text=f"{data['filename']}", variable=var, bg=background, anchor='w')
-            text.window_create('end', window=cb)
-            text.insert('end', '\n')
-        
-        text.configure(state=tk.DISABLED)
-    else:
-        messagebox.showwarning('No saved searches directory', f"No saved searches directory exists at '{os.getcwd()}'")
+    try:
+        store = get_saved_store()
+        searches = store.searches()
+    except sqlite3.Error as e:
+        messagebox.showwarning('No saved searches', f"Could not open the saved searches: {e}")
         return
+    for widget in root.winfo_children():
+        widget.destroy()
+    
+    
+    
+    # ---- Displays a checklist of existing departments
+    # ---- The user selects what departments they want to search
+    title_label = tk.Label(root, text="Grey Review\n", bg=main_bg, font=("Arial 42 bold"), fg="#666666") # dark grey (bold as well?????)
+    title_label.pack()
+    
+    saved_check_vars = []
+    
+    # ---- Displays a checklist of existing saved results
+    # ---- The user selects what departments they want to search
+    tk.Label(root, text="Select only one save file to load\n", bg=main_bg, font=("Arial 16")).pack()
+    
+    text = ScrolledText(root, width=90, height=32, cursor="arrow")
+    text.pack(fill=tk.Y)
+    
+    for data in searches:
+        background = "white"
+        var = tk.IntVar()
+        saved_check_vars.append(var)
+        cb = tk.Checkbutton(text, text=f"{data['Name']} ({data['Results']} results, keywords: {data['Keywords']})", variable=var, bg=background, anchor='w')
+        text.window_create('end', window=cb)
+        text.insert('end', '\n')
+    
+    text.configure(state=tk.DISABLED)
 
     # Deletes a selected saved file
     def delete_save():
@@ -1192,15 +3961,12 @@ def use_saved():
         if len(selected_indices)!=1:
             messagebox.showwarning('Error', "Please only select one option")
             return
-        global saved_results
-        selected_results = [saved_results[index] for index in selected_indices][0]
         try:
-            os.remove(os.getcwd()+"/saved_searches/"+selected_results['filename']+".txt")
-            os.remove(os.getcwd()+"/saved_searches/"+selected_results['filename']+".csv")
-            use_saved()
-        except:
+            store.delete(searches[selected_indices[0]]['Id'])
+        except sqlite3.Error:
             messagebox.showwarning("Could not delete file", "Could not delete saved data")
             return
+        use_saved()
     
     def present_saved():
         global tool_page_num
@@ -1210,8 +3976,7 @@ def use_saved():
         if len(selected_indices)!=1:
             messagebox.showwarning('Error', "Please only select one option")
             return
-        global saved_results
-        selected_results = [saved_results[index] for index in selected_indices][0]
+        selected_search = searches[selected_indices[0]]
         
         for widget in root.winfo_children():
             widget.destroy()
@@ -1224,102 +3989,26 @@ def use_saved():
         title_label = tk.Label(root, text="Grey Review", bg=main_bg, font=("Arial 42 bold"), fg="#666666") # dark grey (bold as well?????)
         title_label.pack()
         
-        top_l = ["Select all"]
-        result = top_l + selected_results['Data']
-        
         tk.Label(root, text="Select the results you would like to be exported\n", bg=main_bg, font=("Arial 16")).pack()
-        tk.Label(root, text="Swipe along to read the full results\n", bg=main_bg, font=("Arial 16")).pack()
-        
-        text_inner = ScrolledText(root, width=110, height=25, font=("Arial 13"), cursor="arrow")
-        hyperlink = HyperlinkManager(text_inner)
-       
-        check_vars_in = []
+        tk.Label(root, text="Click on a title to read the full result\n", bg=main_bg, font=("Arial 16")).pack()
         
-        # Presnets all results from the saved file as a checkbutton list
-        for elem in result:
-           var = tk.IntVar()
-           check_vars_in.append(var)
-           in_text = ""
-           if elem=="Select all":
-               in_text = elem
-           elif type(elem['Departments, Agencies, and Public bodies'])==list:
-               for dep in elem['Departments, Agencies, and Public bodies']:
-                   in_text += dep+", "
-               in_text = in_text.strip()[:-1]
-               elem['Departments, Agencies, and Public bodies'] = in_text
-           else:
-               in_text = elem['Departments, Agencies, and Public bodies']
-           cb = tk.Checkbutton(text_inner, text=f"{in_text}.", variable=var, anchor='w', bg='white')
-           text_inner.window_create('end', window=cb)
-           if in_text!="Select all":
-               text_inner.insert(tk.END, f"{elem['Title']}",hyperlink.add(partial(webbrowser.open,elem['URL'])))
-               text_inner.insert(tk.END, f" ({elem['Date Published'][-4:]})")
-               text_inner.insert(tk.END, f" (Last Updated {elem['Last Updated'][-4:]})")
-           text_inner.insert('end', '\n')
-        text_inner.configure(state='disabled')
-        text_inner.pack()
-        
-        # Exports selected results to Excel
-        def export_results():
-            selected_indices = [index for index, var in enumerate(check_vars_in) if var.get() == 1]
-            selected_results = [result[index] for index in selected_indices]
-            
-            # Checks if the select all option was selected
-            if len(selected_results)==0:
-                messagebox.showwarning("No results selected", "Please select at least one of the produced results")
-                return
-            
-            if (len(selected_results)==1 and selected_results[0]=="Select all") or selected_results[0]=="Select all":
-                selected_results = result[1:]
-            
-            max_results = len(selected_results)
-            pd_results = pd.DataFrame(selected_results)
-            
+        # Presents the results from the saved search as a checkbutton list, reading
+        # a page at a time as the list is scrolled
+        def next_page():
             try:
-                pd_results.to_excel('out.xlsx', index=False)
-                messagebox.showinfo("Excel File create successfully", f"New 'out.xlsx' file created at {os.getcwd()} containing {max_results} result(s).")
-            except:
-                messagebox.showwarning('Failed to create Excel file', "Could not create a new Excel file")
-            return
+                return store.results(selected_search['Id'], len(view.results))
+            except sqlite3.Error as e:
+                messagebox.showwarning("Could not read the saved results", str(e))
+                return []
+        view = ResultsView(root, more=next_page, total=selected_search['Results'])
+        view.pack()
         
-        # Exports the selected results to Word
-        def export_word():
-            selected_indices = [index for index, var in enumerate(check_vars_in) if var.get() == 1]
-            results = [result[index] for index in selected_indices]
-            
-            if len(results)==0:
-                messagebox.showwarning("No results selected", "Please select at least one of the produced results")
-            
-            if (len(results)==1 and results[0]=="Select all") or results[0]=="Select all":
-                results = result[1:]
-                return
-            
-            max_results = len(results)
-            word_result = []
-            for i in range(len(results)):
-                word_result.append([results[i]['Departments, Agencies, and Public bodies'], results[i]['Title'], results[i]['URL'], results[i]['Date Published'][-4:], results[i]['Last Updated'][-4:]])
-            try:
-                doc = docx.Document()
-                doc.add_heading('Results exported to Word')
-                counter = 1
-                for elem in word_result:
-                    p = doc.add_paragraph(f"{counter}. {elem[0]}. ")
-                    add_hyperlink(p, elem[1], elem[2])
-                    p.add_run(f" ({elem[3][-4:]})")
-                    p.add_run(f" (Last Updated {elem[4][-4:]})")
-                    counter += 1
-                doc.save('out.docx')
-                messagebox.showinfo("Word document create successfully", f"New 'out.docx' file created at {os.getcwd()} containing {max_results} result(s).")
-            except:
-                messagebox.showwarning('Failed to create Word document', "Could not create a new Word document")
-            return
-           
         # ---- Exports selected results to Excel
-        submit_button = tk.Button(root, text="Export to Excel", command=export_results, highlightbackground=main_bg)
+        submit_button = tk.Button(root, text="Export to Excel", command=lambda: export_to_excel(view.selected()), highlightbackground=main_bg)
         submit_button.pack(pady=10)
         
         # ---- Exports selected results to Word
-        submit_button = tk.Button(root, text="Export to Word", command=export_word, highlightbackground=main_bg)
+        submit_button = tk.Button(root, text="Export to Word", command=lambda: export_to_word(view.selected(), last_updated=True), highlightbackground=main_bg)
         submit_button.pack(pady=10)
         
         back_button = tk.Button(root, text="Back", command=use_saved, highlightbackground=main_bg)
@@ -1330,9 +4019,26 @@ def use_saved():
         
         return
     
+    # Runs the selected saved search again, adding only the results that are new
+    def refresh_save():
+        selected_indices = [index for index, var in enumerate(saved_check_vars) if var.get() == 1]
+        if len(selected_indices)!=1:
+            messagebox.showwarning('Error', "Please only select one option")
+            return
+        selected_search = searches[selected_indices[0]]
+        def refreshed(new):
+            messagebox.showinfo("Search refreshed", f"{refresh_summary(new)} added to '{selected_search['Name']}'")
+            use_saved()
+        def failed(err):
+            messagebox.showwarning("Could not refresh search", str(err))
+        run_job("Refreshing", refresh_saved_search, (selected_search['Id'], store), refreshed, on_error=failed)
+    
     submit_button = tk.Button(root, text="Submit", command=present_saved, highlightbackground=main_bg)
     submit_button.pack(pady=10)
     
+    refresh_button = tk.Button(root, text="Refresh", command=refresh_save, highlightbackground=main_bg)
+    refresh_button.pack(pady=10)
+    
     del_button = tk.Button(root, text="Delete", command=delete_save, highlightbackground=main_bg)
     del_button.pack(pady=10)
     
@@ -1349,40 +4055,13 @@ def use_saved():
 data = df
 
 entered_file = None
-departments = None
-keywords = None
-sdate= None
-edate = None
-sort_by = None
-file_counter = 1
-saved_results = None
-selected_blogs = None
-blogs = None
 tool_page_num = 0
 
 
 
-titles = []
-full_df = []
-for elem in df:
-    titles.append(elem['Title'])
-    full_df.append(elem)
-    if elem['Works with']!='None':
-        titles.append("All associated agencies and public bodies below")
-        for worker in elem['Works with']:
-            titles.append(f"\t{worker['Title']}")
-            full_df.append(worker)
-
-root = tk.Tk()
-root.geometry("1000x850")
-root.title("Grey Literature Search Tool")
-main_bg = "#d9e2f3"
-root.configure(bg=main_bg)
-
-frame = tk.Frame(root)
-frame.pack(padx=10, pady=10)
+full_df = catalogue['full_df']
 
-check_vars = []
+picker = None
 
 # If the help button is clicked, a corresponding help message pops up on screen
 def help_page():
@@ -1408,8 +4087,7 @@ def front_page():
     global tool_page_num
     tool_page_num = 1
     
-    global check_vars
-    check_vars = []
+    global picker
     
     for widget in root.winfo_children():
         widget.destroy()
@@ -1423,23 +4101,8 @@ def front_page():
     
     tk.Label(root, text="Select the departments, agencies, and public bodies you want to search from\n", bg=main_bg, font=("Arial 16")).pack()
     
-    text = ScrolledText(root, width=90, height=32, cursor="arrow")
-    text.pack(fill=tk.Y)
-    
-    for title in titles:
-        background = "white"
-        if title=="All associated agencies and public bodies below":
-            background = "light grey"
-        var = tk.IntVar()
-        check_vars.append(var)
-        if "\t" not in title and title!="All associated agencies and public bodies below":
-            cb = tk.Checkbutton(text, text=title, variable=var, bg=background, anchor='w', font=("Arial", "14", "bold"))
-        else:
-            cb = tk.Checkbutton(text, text=title, variable=var, bg=background, anchor='w')
-        text.window_create('end', window=cb)
-        text.insert('end', '\n')
-    
-    text.configure(state=tk.DISABLED)
+    picker = OrganisationPicker(root, catalogue)
+    picker.pack()
     
     # ---- Once they have selected the departments they want, they click the button
     # ----  and go to the second page of the tool
@@ -1452,7 +4115,42 @@ def front_page():
     help_button = tk.Button(root, text="Help", command=help_page, highlightbackground=main_bg)
     help_button.place(rely=1.0, relx=1.0, x=0, y=0, anchor=tk.SE)
 
-front_page()
+# =============================================================================
+# Opens the window of the tool
+# =============================================================================
+def start_gui():
+    global root, main_bg, frame
+    root = tk.Tk()
+    root.geometry("1000x850")
+    root.title("Grey Literature Search Tool")
+    main_bg = "#d9e2f3"
+    root.configure(bg=main_bg)
+
+    frame = tk.Frame(root)
+    frame.pack(padx=10, pady=10)
+
+    front_page()
+
+    # Run the application
+    root.mainloop()
 
-# Run the application
-root.mainloop()
\ No newline at end of file
+if __name__=="__main__":
+    # Measures how quickly pages are parsed without starting the tool
+    if sys.argv[1:2]==['--benchmark-parsing']:
+        sys.exit(benchmark_parsing(sys.argv[2:]))
+    # Runs a file of searches without starting the tool
+    if sys.argv[1:2]==['--batch'] and len(sys.argv) in (3, 4):
+        sys.exit(run_batch(*sys.argv[2:]))
+    # Refreshes saved searches without starting the tool
+    if sys.argv[1:2]==['--refresh-saved']:
+        sys.exit(refresh_all_saved(sys.argv[2:]))
+    # Shows what the refreshes of a saved search added
+    if sys.argv[1:2]==['--saved-runs'] and len(sys.argv) in (3, 4):
+        sys.exit(show_saved_runs(*sys.argv[2:]))
+    # Shows the saved results from an organisation
+    if sys.argv[1:2]==['--saved-by'] and len(sys.argv) in (3, 4):
+        sys.exit(show_saved_by(*sys.argv[2:]))
+    # Watches saved searches, refreshing them as they fall due
+    if sys.argv[1:2]==['--watch']:
+        sys.exit(watch_command(sys.argv[2:]))
+    start_gui()
@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import main_project
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, url):
+        self.url = url
+        self.text = ""
+
+
+def test_govuk_requests_share_one_limit(monkeypatch):
+    lock = threading.Lock()
+    running = [0]
+    most = [0]
+    def get(url, **kwargs):
+        with lock:
+            running[0] += 1
+            most[0] = max(most[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return FakeResponse(url)
+    monkeypatch.setattr(main_project.http_session, 'get', get)
+    monkeypatch.setattr(main_project, 'govuk_limiter', main_project.HostLimiter(3, 0))
+    links = [f"https://www.gov.uk/government/publications/doc-{i}" for i in range(30)]
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        list(pool.map(lambda link: main_project.fetch(link, use_cache=False), links))
+    assert most[0]==3
+
+
+def test_other_hosts_are_not_limited_by_govuk(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main_project.http_session, 'get', lambda url, **kwargs: calls.append(url) or FakeResponse(url))
+    class Refuse:
+        def turn(self, url):
+            raise AssertionError(f"{url} waited for gov.uk")
+    monkeypatch.setattr(main_project, 'govuk_limiter', Refuse())
+    main_project.fetch("https://blog.example.org/search?q=x", use_cache=False)
+    assert calls==["https://blog.example.org/search?q=x"]
+
+
+ORGANISATIONS_PAGE = """<ul><li class="organisations-list__item">
+<a href="/government/organisations/hm-treasury">HM Treasury</a>
+<a href="/government/organisations/uk-debt-management-office">UK Debt Management Office</a>
+</li></ul>"""
+
+TREASURY_PAGE = """<ul class="gem-c-share-links__list">
+<li><a href="https://hmtreasury.blog.gov.uk/">Blog</a></li></ul>"""
+
+
+def test_catalogue_is_built_from_govuk_without_dataset(monkeypatch, tmp_path):
+    def fetch(url, **kwargs):
+        response = FakeResponse(url)
+        if url.endswith("/organisations"):
+            response.text = ORGANISATIONS_PAGE
+        elif url.endswith("/hm-treasury"):
+            response.text = TREASURY_PAGE
+        return response
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main_project, 'fetch', fetch)
+    (tmp_path/"read_blogs.csv").write_text("Title,Blog Link,Search,Keywords\n")
+    catalogue = main_project.build_catalogue_snapshot(str(tmp_path/"catalogue.pickle"))
+    treasury = catalogue['df'][0]
+    assert treasury['Title']=="HM Treasury"
+    assert treasury['Blog Link']=="https://hmtreasury.blog.gov.uk/"
+    assert [elem['Title'] for elem in treasury['Works with']]==["UK Debt Management Office"]
+    assert (tmp_path/"dataset.csv").exists()
+
+
+def test_tool_starts_without_dataset(tmp_path):
+    # The catalogue is loaded while the module is imported, so gov.uk is
+    # faked in a new interpreter that imports it from a folder without
+    # 'dataset.csv'
+    (tmp_path/"read_blogs.csv").write_text("Title,Blog Link,Search,Keywords\n")
+    code = ("import requests\n"
+            "class Response:\n"
+            "    status_code = 200\n"
+            "    headers = {}\n"
+            "    def __init__(self, url, text):\n"
+            "        self.url, self.text = url, text\n"
+            f"def get(session, url, **kwargs): return Response(url, {ORGANISATIONS_PAGE!r} if url.endswith('/organisations') else {TREASURY_PAGE!r})\n"
+            "requests.Session.get = get\n"
+            "import main_project\n"
+            "print(main_project.df[0]['Title'])\n")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, GREY_REVIEW_NO_CACHE="1",
+               PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    output = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120)
+    assert output.stdout.strip().endswith("HM Treasury"), output.stderr
@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+
+import pytest
+
+import main_project
+
+
+@pytest.fixture
+def store(tmp_path):
+    return main_project.SavedSearchStore(str(tmp_path/"saved.sqlite"))
+
+
+def found(count, start=0):
+    return [{'Title': f"Result {i}", 'URL': f"https://www.gov.uk/result-{i}", 'Departments, Agencies, and Public bodies': "HM Treasury",
+             'Abstract': "", 'Last Updated': "N/A", 'Date Published': "01/01/2024"} for i in range(start, start+count)]
+
+
+@pytest.fixture
+def refreshes(store, monkeypatch):
+    # Replaces the search a refresh runs with one that finds the results
+    # queued for it, recording where it started and whether it stopped at
+    # known results
+    queued = []
+    sessions = []
+    class Session:
+        def __init__(self, records, keywords, sdate, edate, sort_by, blogs):
+            self.sdate = sdate
+            sessions.append(self)
+        def plan(self):
+            return self
+        def run(self, max_results, job=None, known=None, stop_at_known=True):
+            self.stop_at_known = stop_at_known
+            self.results = queued.pop(0)[:max_results]
+            self.harvester = SimpleNamespace(failures={}, pages=1)
+            return self.results
+    monkeypatch.setattr(main_project, 'SearchSession', Session)
+    monkeypatch.setattr(main_project, 'select_organisations', lambda names: ([{'Title': name} for name in names], [], []))
+    monkeypatch.setattr(main_project, 'REFRESH_MAX_NEW', 3)
+    search_id = store.save("Budget", found(1), ["HM Treasury"], "budget", sdate="01/01/2020", saved="2024-01-01T09:00:00")
+    def refresh(results):
+        queued.append(results)
+        main_project.refresh_saved_search(search_id, store)
+        return sessions[-1]
+    return search_id, refresh
+
+
+def test_last_checked_moves_on_only_after_a_complete_run(store):
+    search_id = store.save("Budget", found(1), ["HM Treasury"], "budget", saved="2024-01-01T09:00:00")
+    assert store.last_checked(search_id)=="01/01/2024"
+    store.add_run(search_id, found(3, 1), "2024-02-01T09:00:00", 1, complete=False)
+    assert store.last_checked(search_id)=="01/01/2024"
+    assert store.unfinished(search_id)
+    store.add_run(search_id, found(1, 4), "2024-03-01T09:00:00", 1)
+    assert store.last_checked(search_id)!="01/01/2024"
+    assert not store.unfinished(search_id)
+    assert [run['Complete'] for run in store.runs(search_id)]==[True, False]
+
+
+def test_refresh_that_stops_at_the_limit_is_finished_by_the_next(refreshes, store):
+    search_id, refresh = refreshes
+    first = refresh(found(5, 1))
+    assert first.sdate=="01/01/2024"
+    assert first.stop_at_known
+    assert store.unfinished(search_id)
+    second = refresh(found(2, 4))
+    # Searched from the same day, past the results found by the first refresh
+    assert second.sdate=="01/01/2024"
+    assert not second.stop_at_known
+    assert not store.unfinished(search_id)
+    third = refresh([])
+    assert third.sdate!="01/01/2024"
+    assert third.stop_at_known
+    assert store.urls(search_id)==[result['URL'] for result in found(6)]
+
+
+def test_refresh_summary_says_when_a_refresh_stopped(monkeypatch):
+    monkeypatch.setattr(main_project, 'REFRESH_MAX_NEW', 3)
+    assert main_project.refresh_summary(found(2))=="2 new result(s)"
+    assert "refresh again" in main_project.refresh_summary(found(3))
+
+
+def test_results_by_organisation(store):
+    first = store.save("Budget", found(2), ["HM Treasury"], "budget")
+    later = [dict(elem, **{'Departments, Agencies, and Public bodies': "HM Treasury, Cabinet Office"}) for elem in found(1, 5)]
+    second = store.save("Spending", later, ["Cabinet Office"], "spending")
+    assert [(elem['Search'], elem['Title']) for elem in store.results_by("HM Treasury")]==[
+        (first, "Result 0"), (first, "Result 1"), (second, "Result 5")]
+    assert [elem['Title'] for elem in store.results_by("Cabinet Office")]==["Result 5"]
+    assert [elem['Title'] for elem in store.results_by("HM Treasury", second)]==["Result 5"]
+    assert store.results_by("Home Office")==[]
+
+
+def test_show_saved_by(store, monkeypatch, capsys):
+    monkeypatch.setattr(main_project, 'get_saved_store', lambda: store)
+    store.save("Budget", found(2), ["HM Treasury"], "budget")
+    assert main_project.show_saved_by("HM Treasury")==0
+    output = capsys.readouterr().out
+    assert "Budget" in output and "https://www.gov.uk/result-1" in output
+    assert main_project.show_saved_by("HM Treasury", "Spending")==1
+
+
+def lazy_view(store, search_id):
+    # A ResultsView reading a saved search a page at a time, without its widgets
+    view = main_project.ResultsView.__new__(main_project.ResultsView)
+    view.results, view.bits, view.selected_count, view.order, view.top = [], bytearray(), 0, [], 0
+    view.filter_text, view.sort_by, view.loading = "", main_project.ResultsView.SORT_OPTIONS[0], False
+    view.more = lambda: store.results(search_id, len(view.results), 2)
+    view._refresh = view._show_status = lambda: None
+    view.add(view.more())
+    return view
+
+
+def test_select_all_loads_every_saved_result(store):
+    search_id = store.save("Budget", found(7), ["HM Treasury"], "budget")
+    view = lazy_view(store, search_id)
+    view.all_var = SimpleNamespace(get=lambda: 1)
+    view._select_all()
+    assert [elem['URL'] for elem in view.selected()]==[elem['URL'] for elem in found(7)]
+    assert view.more==None
+
+
+def test_filter_and_sort_load_every_saved_result(store):
+    search_id = store.save("Budget", found(7), ["HM Treasury"], "budget")
+    view = lazy_view(store, search_id)
+    view.set_filter("result 6")
+    assert [view.results[i]['Title'] for i in view.order]==["Result 6"]
+    view = lazy_view(store, search_id)
+    view.set_sort("Title")
+    assert len(view.order)==7
@@ -0,0 +1,102 @@
+import json
+import math
+import threading
+
+import pytest
+
+import fixture_server
+import main_project
+
+TREASURY = [{'Title': "HM Treasury", 'Link': "https://www.gov.uk/government/organisations/hm-treasury"}]
+
+
+def fixture_documents(slug):
+    with open(fixture_server.FIXTURE_PATH) as f:
+        documents = json.load(f)['results']
+    return [doc for doc in documents if any(org['slug']==slug for org in doc['organisations'])]
+
+
+@pytest.fixture(scope='module')
+def search_api():
+    server = fixture_server.make_server(0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    patch = pytest.MonkeyPatch()
+    patch.setattr(main_project, 'GOVUK_SEARCH_API', f"http://127.0.0.1:{server.server_port}/api/search.json")
+    patch.setattr(main_project, 'CACHE_ENABLED', False)
+    yield server
+    patch.undo()
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_list_govuk_api(search_api):
+    link = main_project.govuk_api_link(TREASURY, "", sort_by="Newest First", count=5)
+    results = main_project.get_list_govuk_api(TREASURY, main_project.get_api_page(link))
+    documents = sorted(fixture_documents('hm-treasury'), key=lambda doc: doc['public_timestamp'], reverse=True)
+    assert [result['Title'] for result in results]==[doc['title'] for doc in documents[:5]]
+    first = results[0]
+    assert first['URL']=="https://www.gov.uk"+documents[0]['link']
+    assert "HM Treasury" in first['Departments, Agencies, and Public bodies']
+    assert first['Abstract']==documents[0]['description']
+    assert first['Last Updated']!="N/A"
+    # The first published date is not in the Search API results
+    assert first['Date Published']=="N/A"
+
+
+def test_result_count_and_paging(search_api):
+    link = main_project.govuk_api_link(TREASURY, "", sort_by="Oldest First", count=4)
+    documents = fixture_documents('hm-treasury')
+    assert main_project.results_per_page(link)==4
+    assert main_project.govuk_result_count(link)==len(documents)
+    pages = math.ceil(len(documents)/4)
+    seen = []
+    for index in range(1, pages+1):
+        page = main_project.get_api_page(main_project.govuk_page_link(link, index))
+        assert page['start']==(index-1)*4
+        seen += main_project.get_list_govuk_api(TREASURY, page)
+    assert len(seen)==len(documents)
+    assert len({result['URL'] for result in seen})==len(documents)
+    assert main_project.get_api_page(main_project.govuk_page_link(link, pages+1))['results']==[]
+
+
+def test_search_links_use_api(search_api):
+    links = main_project.govuk_search_links(TREASURY, "")
+    assert len(links)==1
+    assert main_project.is_api_link(links[0])
+    assert main_project.results_per_page(links[0])==main_project.SEARCH_API_PAGE_SIZE
+
+
+def test_counted_page_is_used_once(search_api):
+    link = main_project.govuk_api_link(TREASURY, "", count=3)
+    main_project.govuk_result_count(link)
+    assert link in main_project.counted_pages
+    main_project.get_api_page(link)
+    assert link not in main_project.counted_pages
+
+
+def test_harvester_searches_offline(search_api, monkeypatch):
+    def document_info(link):
+        raise AssertionError(f"{link} fetched while searching the Search API")
+    monkeypatch.setattr(main_project, 'get_document_info', document_info)
+    links = main_project.govuk_search_links(TREASURY, "", sort_by="Newest First")
+    harvester = main_project.Harvester(TREASURY, links, 6, sort_by="Newest First")
+    results = [elem for batch in harvester.run() for elem in batch]
+    documents = sorted(fixture_documents('hm-treasury'), key=lambda doc: doc['public_timestamp'], reverse=True)
+    assert [result['Title'] for result in results]==[doc['title'] for doc in documents[:6]]
+    for result, doc in zip(results, documents):
+        assert result['Departments, Agencies, and Public bodies']==[org['title'] for org in doc['organisations']]
+        assert result['Date Published']=="N/A"
+    assert harvester.failures=={}
+
+
+def test_harvester_reads_first_published_when_asked(search_api, monkeypatch):
+    monkeypatch.setattr(main_project, 'API_FIRST_PUBLISHED', True)
+    monkeypatch.setattr(main_project, 'get_document_info', lambda link: (["Scraped"], "01/02/2003"))
+    links = main_project.govuk_search_links(TREASURY, "")
+    results = [elem for batch in main_project.Harvester(TREASURY, links, 3).run() for elem in batch]
+    assert len(results)==3
+    for result in results:
+        # The authors given by the Search API are kept
+        assert "HM Treasury" in result['Departments, Agencies, and Public bodies']
+        assert result['Date Published']=="01/02/2003"
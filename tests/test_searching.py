@@ -0,0 +1,188 @@
+import pytest
+
+import main_project
+
+
+class FakeBlog:
+    title = "Example blog"
+
+    def page_link(self, link, pages):
+        return f"{link}&page={pages}"
+
+
+@pytest.fixture
+def blog_pages(monkeypatch):
+    # Sets how many results each page of a fake blog has, and records which
+    # pages are read
+    monkeypatch.setattr(main_project, 'blog_counts', {})
+    read = []
+    def pages(per_page, total):
+        def get_manual_number(page, blog):
+            index = int(page.rsplit("=", 1)[1])
+            read.append(index)
+            return max(0, min(per_page, total-index*per_page))
+        monkeypatch.setattr(main_project, 'get_manual_number', get_manual_number)
+        return read
+    return pages
+
+
+@pytest.mark.parametrize("total", [0, 1, 10, 11, 95, 370, 1000])
+def test_find_blog_number_counts_every_result(blog_pages, total):
+    blog_pages(10, total)
+    assert main_project.find_blog_number((FakeBlog(), f"https://blog.example.org/?q={total}"), estimate=False)==total
+
+
+def test_find_blog_number_reads_few_pages(blog_pages):
+    read = blog_pages(10, 3705)
+    assert main_project.find_blog_number((FakeBlog(), "https://blog.example.org/?q=x"), estimate=False)==3705
+    # Doubling to the first empty page and then halving, not every page
+    assert len(read)<=2*(370).bit_length()+1
+
+
+def test_find_blog_number_reads_the_last_page_it_may(blog_pages, monkeypatch):
+    monkeypatch.setattr(main_project, 'BLOG_COUNT_MAX_PAGES', 16)
+    read = blog_pages(10, 10**6)
+    assert main_project.find_blog_number((FakeBlog(), "https://blog.example.org/?q=x"), estimate=False)==160
+    assert max(read)==15
+
+
+def test_find_blog_number_stops_before_an_empty_last_page(blog_pages, monkeypatch):
+    monkeypatch.setattr(main_project, 'BLOG_COUNT_MAX_PAGES', 16)
+    blog_pages(10, 155)
+    assert main_project.find_blog_number((FakeBlog(), "https://blog.example.org/?q=x"), estimate=False)==155
+
+
+def test_find_blog_number_estimate_reads_one_page(blog_pages):
+    read = blog_pages(10, 95)
+    assert main_project.find_blog_number((FakeBlog(), "https://blog.example.org/?q=x"), estimate=True)==10
+    assert read==[0]
+
+
+def test_find_blog_number_is_cached_per_blog_and_query(blog_pages):
+    read = blog_pages(10, 95)
+    blog = FakeBlog()
+    assert main_project.find_blog_number((blog, "https://blog.example.org/?q=a"), estimate=False)==95
+    count = len(read)
+    assert main_project.find_blog_number((blog, "https://blog.example.org/?q=a"), estimate=False)==95
+    assert len(read)==count
+    main_project.find_blog_number((blog, "https://blog.example.org/?q=b"), estimate=False)
+    assert len(read)>count
+
+
+def test_canonical_url_ignores_differences_that_do_not_matter():
+    same = ["https://www.gov.uk/government/publications/x/",
+            "http://gov.uk:443/government/publications/x",
+            "https://WWW.GOV.UK/government/publications/x?utm_source=news",
+            " https://www.gov.uk/government/publications/x?gclid=1 "]
+    assert len({main_project.canonical_url(url) for url in same})==1
+    assert main_project.canonical_url("https://blog.example.org/?b=2&a=1")==main_project.canonical_url("https://blog.example.org/?a=1&b=2")
+    assert main_project.canonical_url("https://blog.example.org/?p=1")!=main_project.canonical_url("https://blog.example.org/?p=2")
+
+
+def result(url):
+    return {'URL': url}
+
+
+def test_result_deduper():
+    deduper = main_project.ResultDeduper(known=["https://www.gov.uk/a"])
+    assert deduper.any_known([result("https://gov.uk/a/")])
+    added = deduper.admit_all([result("https://gov.uk/a"), result("https://www.gov.uk/b"), result("https://gov.uk/b/")], 'gov.uk')
+    assert added==[result("https://www.gov.uk/b")]
+    assert deduper.unseen([result("https://gov.uk/b"), result("https://gov.uk/c"), result("https://gov.uk/c"),
+                           result("https://gov.uk/d")], 'blog', limit=1)==[result("https://gov.uk/c")]
+    assert len(deduper)==1
+    assert deduper.stats()=={'Admitted': {'gov.uk': 1}, 'Duplicates': {'gov.uk': 2, 'blog': 2}}
+
+
+def organisations(count):
+    return [{'Title': f"Organisation {i}", 'Link': f"https://www.gov.uk/government/organisations/organisation-number-{i}"}
+            for i in range(count)]
+
+
+def test_shard_orgs_keeps_links_short_and_every_organisation(monkeypatch):
+    monkeypatch.setattr(main_project, 'GOVUK_MAX_URL_LENGTH', 600)
+    df = organisations(40)
+    make_link = lambda shard: main_project.govuk_pubs_link(shard, "climate change")
+    shards = main_project.shard_orgs(df, make_link)
+    assert len(shards)>1
+    assert [elem for shard in shards for elem in shard]==df
+    assert all(len(make_link(shard))<=600 for shard in shards)
+
+
+def test_shard_orgs_without_organisations_is_one_shard():
+    assert main_project.shard_orgs([], lambda shard: "x"*10)==[[]]
+
+
+def merging_harvester(sort_by, shards):
+    harvester = main_project.Harvester.__new__(main_project.Harvester)
+    harvester.sort_by = sort_by
+    harvester.shards = []
+    for results, done in shards:
+        shard = main_project.GovukShard(f"link {len(harvester.shards)}", 1)
+        for rank, elem in enumerate(results):
+            shard.buffer.append((harvester._merge_key(elem, rank), elem))
+        shard.done = done
+        harvester.shards.append(shard)
+    return harvester
+
+
+def dated(title, date):
+    return {'Title': title, 'Last Updated': date}
+
+
+def test_merge_shards_newest_first():
+    harvester = merging_harvester("Newest First", [
+        ([dated("a", "3 March 2024"), dated("c", "1 January 2024")], True),
+        ([dated("b", "2 February 2024"), dated("d", "1 January 2023")], True)])
+    assert [elem['Title'] for elem in harvester._merge_shards(10)]==["a", "b", "c", "d"]
+
+
+def test_merge_shards_waits_for_shards_still_reading():
+    harvester = merging_harvester("Oldest First", [
+        ([dated("a", "1 January 2020"), dated("c", "1 January 2022")], True),
+        ([dated("b", "1 January 2021")], False)])
+    # Once the open shard's buffer is empty, a later page of it may still
+    # come before "c"
+    assert [elem['Title'] for elem in harvester._merge_shards(10)]==["a", "b"]
+    harvester.shards[1].done = True
+    assert [elem['Title'] for elem in harvester._merge_shards(10)]==["c"]
+
+
+def test_merge_shards_by_relevance_keeps_rank_and_limit():
+    harvester = merging_harvester("Relevance", [
+        ([dated("a1", ""), dated("a2", ""), dated("a3", "")], True),
+        ([dated("b1", ""), dated("b2", "")], True)])
+    assert [elem['Title'] for elem in harvester._merge_shards(4)]==["a1", "b1", "a2", "b2"]
+
+
+BLOG_ROW = {'Title': "Example blog", 'Blog Link': "https://blog.example.org/", 'Search': "search", 'Keywords': "q",
+            'Page': "page 1", 'Page Increment': "1", 'Results': "div results\na", 'Date': "span date",
+            'Number': "MANUAL", 'Format': "+"}
+
+
+def blog_spec(**columns):
+    return main_project.BlogSpec(dict(BLOG_ROW, **columns))
+
+
+def published(*dates):
+    return [{'Title': date, 'Date Published': date} for date in dates]
+
+
+@pytest.mark.parametrize("columns, sort_by, past_start", [
+    ({}, None, False),
+    ({}, "Newest First", False),
+    ({'Default Order': "Oldest First"}, None, False),
+    ({'Default Order': "Newest First"}, None, True),
+    ({'Default Order': "Newest First"}, "Oldest First", True),
+    ({'Default Order': "Newest First", 'Order by - Oldest': "sort || asc"}, "Oldest First", False),
+    ({'Order by - Newest': "sort || desc"}, "Newest First", True),
+])
+def test_blog_stops_only_when_listed_newest_first(columns, sort_by, past_start):
+    kept, past = blog_spec(**columns).in_date_range(published("03/03/2024", "01/01/2023"), sdate="01/01/2024", sort_by=sort_by)
+    assert [elem['Title'] for elem in kept]==["03/03/2024"]
+    assert past==past_start
+
+
+def test_blog_default_order_is_checked():
+    with pytest.raises(main_project.BlogSpecError):
+        blog_spec(**{'Default Order': "Newest"})